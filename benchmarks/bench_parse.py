@@ -0,0 +1,152 @@
+"""
+Benchmarks of HDF5MBEParser.parse and the normalization of MBESynthesis archives.
+
+Synthetic files of increasing size are generated for every case and each case is
+timed a few times, keeping the fastest run. Besides wall times, the number of
+datasets read by the parser is recorded; it does not depend on the machine and
+exposes I/O regressions exactly.
+
+    python benchmarks/bench_parse.py                      # run and print results
+    python benchmarks/bench_parse.py --save baseline.json # store a new baseline
+    python benchmarks/bench_parse.py --compare benchmarks/baseline.json
+
+With --compare the exit code is 1 if a case got slower than the tolerance allows
+or reads more datasets than in the baseline.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from nomad.client import normalize_all
+from nomad.datamodel import EntryArchive, EntryMetadata
+
+from nomad_plugin_mbe.parsers.mbe_parser import HDF5MBEParser
+from nomad_plugin_mbe.parsers.synthetic import write_mbe_nexus
+
+CASES = {
+    'layers_10': dict(n_layers=10),
+    'layers_100': dict(n_layers=100),
+    'layers_1000': dict(n_layers=1000),
+    'layers_2000': dict(n_layers=2000),
+    'columnar_layers_2000': dict(n_layers=2000, columnar=True),
+    'compact_layers_2000': dict(
+        n_layers=2000, parser_options=dict(compact_layers=True)
+    ),
+    'compact_columnar_layers_2000': dict(
+        n_layers=2000, columnar=True, parser_options=dict(compact_layers=True)
+    ),
+    'repeats_layers_2000': dict(
+        n_layers=2000, parser_options=dict(detect_repeats=True)
+    ),
+    'cells_4_layers_1000': dict(n_layers=1000, n_cells=4),
+    'sensors_4_samples_100k': dict(n_sensors=4, n_samples=100_000),
+    'sensors_4_samples_1M': dict(n_sensors=4, n_samples=1_000_000, compression='gzip'),
+    'anomalies_sensors_4_samples_1M': dict(
+        n_sensors=4,
+        n_samples=1_000_000,
+        compression='gzip',
+        parser_options=dict(detect_anomalies=True),
+    ),
+    'users_20_sensors_20': dict(n_users=20, n_sensors=20),
+}
+
+
+def run_case(path, repeat, parser_options=None):
+    """Returns the fastest parse and normalization times and the parse trace."""
+    logger = logging.getLogger('benchmark')
+    parser = HDF5MBEParser(**(parser_options or {}))
+    parse_seconds = normalize_seconds = float('inf')
+    for _ in range(repeat):
+        archive = EntryArchive(metadata=EntryMetadata())
+        start = time.perf_counter()
+        parser.parse(str(path), archive, logger)
+        parse_seconds = min(parse_seconds, time.perf_counter() - start)
+        start = time.perf_counter()
+        normalize_all(archive)
+        normalize_seconds = min(normalize_seconds, time.perf_counter() - start)
+    trace = parser.last_trace
+    return dict(
+        parse_seconds=parse_seconds,
+        normalize_seconds=normalize_seconds,
+        datasets_read=trace.datasets_read,
+        bytes_read=trace.bytes_read,
+    )
+
+
+def run(cases, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in cases:
+            file_options = dict(CASES[name])
+            parser_options = file_options.pop('parser_options', None)
+            path = write_mbe_nexus(Path(directory) / f'{name}.nxs', **file_options)
+            results[name] = run_case(path, repeat, parser_options)
+            print(
+                f'{name:28s} parse {results[name]["parse_seconds"]:8.4f} s  '
+                f'normalize {results[name]["normalize_seconds"]:8.4f} s  '
+                f'datasets {results[name]["datasets_read"]:7d}'
+            )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Prints the ratios to the baseline and returns whether any case regressed."""
+    regressed = False
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        ratios = {
+            key: result[key] / reference[key]
+            for key in ('parse_seconds', 'normalize_seconds')
+            if reference[key] > 0
+        }
+        slower = [key for key, ratio in ratios.items() if ratio > tolerance]
+        more_reads = result['datasets_read'] > reference['datasets_read']
+        status = 'REGRESSION' if slower or more_reads else 'ok'
+        regressed |= status != 'ok'
+        print(
+            f'{name:28s} '
+            + '  '.join(f'{key} x{ratio:.2f}' for key, ratio in ratios.items())
+            + f'  datasets {reference["datasets_read"]} -> {result["datasets_read"]}'
+            + f'  {status}'
+        )
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        'cases', nargs='*', help=f'cases to run, all by default: {", ".join(CASES)}'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=3, help='runs per case, the fastest is kept'
+    )
+    parser.add_argument('--save', help='write the results as a baseline to this file')
+    parser.add_argument('--compare', help='compare the results with this baseline file')
+    parser.add_argument(
+        '--tolerance', type=float, default=1.5, help='allowed slowdown factor'
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+
+    results = run(args.cases or list(CASES), args.repeat)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        return 1 if compare(results, baseline, args.tolerance) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
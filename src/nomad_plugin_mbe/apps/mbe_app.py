@@ -1,28 +1,32 @@
 from nomad.config.models.ui import (
     App,
+    Axis,
     Column,
-    SearchQuantities,
     Menu,
-    MenuItemTerms,
     MenuItemCustomQuantities,
     MenuItemHistogram,
-    Axis,
+    MenuItemPeriodicTable,
+    MenuItemTerms,
     MenuItemVisibility,
+    SearchQuantities,
 )
 
-
 dir_mbe = "nomad_plugin_mbe.schema_packages.mbe_schema.MBESynthesis"
 
 sample_search_app = App(
     label="MBE Sample Search",
     path="sample_search",
     category="MBE Growth",
-    description="Search and filter MBE growth samples based on process parameters or metadata.",
+    description=(
+        "Search and filter MBE growth samples based on process parameters or metadata."
+    ),
     readme="""
     This app allows users to search for MBE samples by filtering key growth parameters,
     characterisitcs of the substrate and several metadata.
     """,
-    search_quantities=SearchQuantities(include=[f'*#{dir_mbe}']),
+    search_quantities=SearchQuantities(
+        include=[f'*#{dir_mbe}', 'results.material.elements']
+    ),
     columns=[
         Column(quantity="entry_name", selected=True),
         Column(quantity="entry_type"),
@@ -30,6 +34,8 @@ sample_search_app = App(
         Column(quantity=f"data.title#{dir_mbe}", selected=True),
         Column(quantity=f"data.sample.thickness#{dir_mbe}", selected=True),
         Column(quantity=f"data.duration#{dir_mbe}", selected=True),
+        Column(quantity=f"data.stack_summary.n_layers#{dir_mbe}"),
+        Column(quantity="results.material.elements"),
     ],
     filters_locked={"section_defs.definition_qualified_name": dir_mbe},
     menu=Menu(
@@ -80,6 +86,20 @@ sample_search_app = App(
                             ),
                         ),
             ]),
+            Menu(title="Elements",
+                    items=[
+                        MenuItemPeriodicTable(
+                            title="Elements",
+                            type="periodic_table",
+                            search_quantity="results.material.elements",
+                            show_statistics=True,
+                        ),
+                        MenuItemTerms(
+                            title="Layer Composition",
+                            type="terms",
+                            search_quantity=f"data.stack_summary.reduced_formulas#{dir_mbe}"
+                        ),
+            ]),
             Menu(title="Layers Info",
                     items=[
                         MenuItemTerms(
@@ -92,72 +112,116 @@ sample_search_app = App(
                             type="terms",
                             search_quantity=f"data.sample.layer.chemical_formula#{dir_mbe}"
                         ),
+                        MenuItemTerms(
+                            title="Cells Used",
+                            type="terms",
+                            search_quantity=f"data.stack_summary.cell_names#{dir_mbe}"
+                        ),
                         MenuItemHistogram(
-                            title="Layer Doping",
+                            title="Number of Layers",
                             type="histogram",
                             n_bins=10,
                             x=Axis(
-                                search_quantity=f"data.sample.layer.doping#{dir_mbe}",
-                                title="Layer Thickness",
-                                unit="cm^-3"
+                                search_quantity=f"data.stack_summary.n_layers#{dir_mbe}",
+                                title="Number of Layers"
                             ),
                         ),
                         MenuItemHistogram(
-                            title="Layer Thickness",
+                            title="Total Layer Thickness",
                             type="histogram",
                             n_bins=10,
                             x=Axis(
-                                search_quantity=f"data.sample.layer.thickness#{dir_mbe}",
-                                title="Layer Thickness",
+                                search_quantity=f"data.stack_summary.total_thickness#{dir_mbe}",
+                                title="Total Layer Thickness",
                                 unit="angstrom"
                             ),
                         ),
                         MenuItemHistogram(
-                            title="Layer Growth Temperature",
+                            title="Thinnest Layer",
                             type="histogram",
                             n_bins=10,
                             x=Axis(
-                                search_quantity=f"data.sample.layer.growth_temperature#{dir_mbe}",
-                                title="Layer Growth Temperature",
+                                search_quantity=f"data.stack_summary.min_layer_thickness#{dir_mbe}",
+                                title="Thinnest Layer",
+                                unit="angstrom"
+                            ),
+                        ),
+                        MenuItemHistogram(
+                            title="Thickest Layer",
+                            type="histogram",
+                            n_bins=10,
+                            x=Axis(
+                                search_quantity=f"data.stack_summary.max_layer_thickness#{dir_mbe}",
+                                title="Thickest Layer",
+                                unit="angstrom"
+                            ),
+                        ),
+                        MenuItemHistogram(
+                            title="Min Growth Temperature",
+                            type="histogram",
+                            n_bins=10,
+                            x=Axis(
+                                search_quantity=f"data.stack_summary.min_growth_temperature#{dir_mbe}",
+                                title="Min Growth Temperature",
                                 unit="celsius"
                             ),
                         ),
                         MenuItemHistogram(
-                            title="Layer Growth Time",
+                            title="Max Growth Temperature",
                             type="histogram",
                             n_bins=10,
                             x=Axis(
-                                search_quantity=f"data.sample.layer.growth_time#{dir_mbe}",
-                                title="Layer Growth Time",
+                                search_quantity=f"data.stack_summary.max_growth_temperature#{dir_mbe}",
+                                title="Max Growth Temperature",
+                                unit="celsius"
+                            ),
+                        ),
+                        MenuItemHistogram(
+                            title="Total Growth Time",
+                            type="histogram",
+                            n_bins=10,
+                            x=Axis(
+                                search_quantity=f"data.stack_summary.total_growth_time#{dir_mbe}",
+                                title="Total Growth Time",
                                 unit="s"
                             ),
                         ),
                         MenuItemHistogram(
-                            title="Layer Total Growth Rate",
+                            title="Max Growth Rate",
                             type="histogram",
                             n_bins=10,
                             x=Axis(
-                                search_quantity=f"data.sample.layer.growth_rate#{dir_mbe}",
-                                title="Layer Total Growth Rate",
+                                search_quantity=f"data.stack_summary.max_growth_rate#{dir_mbe}",
+                                title="Max Growth Rate",
                                 unit="angstrom/s"
                             ),
                         ),
                         MenuItemHistogram(
-                            title="Layer Alloy Fraction",
+                            title="Max Doping",
+                            type="histogram",
+                            n_bins=10,
+                            x=Axis(
+                                search_quantity=f"data.stack_summary.max_doping#{dir_mbe}",
+                                title="Max Doping",
+                                unit="cm^-3"
+                            ),
+                        ),
+                        MenuItemHistogram(
+                            title="Max Alloy Fraction",
                             type="histogram",
                             n_bins=10,
                             x=Axis(
-                                search_quantity=f"data.sample.layer.alloy_fraction#{dir_mbe}",
-                                title="Layer Alloy Fraction",
+                                search_quantity=f"data.stack_summary.max_alloy_fraction#{dir_mbe}",
+                                title="Max Alloy Fraction"
                             ),
                         ),
                         MenuItemHistogram(
-                            title="Layer Rotational Frequency",
+                            title="Max Rotational Frequency",
                             type="histogram",
                             n_bins=10,
                             x=Axis(
-                                search_quantity=f"data.sample.layer.rotational_frequency#{dir_mbe}",
-                                title="Layer Rotational Frequency",
+                                search_quantity=f"data.stack_summary.max_rotational_frequency#{dir_mbe}",
+                                title="Max Rotational Frequency",
                                 unit="rpm"
                             ),
                         ),
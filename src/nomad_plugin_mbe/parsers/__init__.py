@@ -1,3 +1,5 @@
+from typing import Optional
+
 from nomad.config.models.plugins import ParserEntryPoint
 from pydantic import Field
 
@@ -18,10 +20,85 @@ parser_entry_point = NewParserEntryPoint(
 )
 
 class HDF5MBEParserEntryPoint(ParserEntryPoint):
+    cache_dir: Optional[str] = Field(
+        None, description='Directory of the parse result cache, no caching if not set'
+    )
+    cache_max_bytes: int = Field(
+        1 << 30, description='Size limit of the parse result cache in bytes'
+    )
+    definition_re: str = Field(
+        r'(?i).*mbe.*',
+        description='Regular expression of the /entry/definition of MBE NeXus files',
+    )
+    detailed_trace: bool = Field(
+        False,
+        description='Include the tree of timed spans in the parse summary event',
+    )
+    in_memory_max_bytes: int = Field(
+        64 << 20,
+        description=(
+            'Files up to this size are read into memory in one read, 0 disables it'
+        ),
+    )
+    chunk_cache_bytes: int = Field(
+        32 << 20,
+        description='Size of the HDF5 chunk cache of every open dataset in bytes',
+    )
+    chunk_cache_slots: int = Field(
+        10007, description='Number of hash slots of the chunk cache, ideally a prime'
+    )
+    page_buffer_bytes: int = Field(
+        0,
+        description=(
+            'Size of the HDF5 page buffer for files with paged allocation, '
+            '0 disables it'
+        ),
+    )
+    compression_filters: bool = Field(
+        True,
+        description=(
+            'Register the LZ4, Blosc, Zstd and other filters of hdf5plugin, '
+            'if installed'
+        ),
+    )
+    compact_layers: bool = Field(
+        False,
+        description=(
+            'Store layer stacks as arrays on the sample instead of one section '
+            'per layer and cell'
+        ),
+    )
+    detect_repeats: bool = Field(
+        False,
+        description=(
+            'Store superlattices in the layer stack as repeat blocks of one period '
+            'and a count'
+        ),
+    )
+    detect_anomalies: bool = Field(
+        False,
+        description=(
+            'Flag outliers and change points in the sensor traces while they are '
+            'parsed'
+        ),
+    )
 
     def load(self):
         from nomad_plugin_mbe.parsers.mbe_parser import HDF5MBEParser
-        return HDF5MBEParser()
+        return HDF5MBEParser(
+            cache_dir=self.cache_dir,
+            cache_max_bytes=self.cache_max_bytes,
+            definition_re=self.definition_re,
+            detailed_trace=self.detailed_trace,
+            in_memory_max_bytes=self.in_memory_max_bytes,
+            chunk_cache_bytes=self.chunk_cache_bytes,
+            chunk_cache_slots=self.chunk_cache_slots,
+            page_buffer_bytes=self.page_buffer_bytes,
+            compression_filters=self.compression_filters,
+            compact_layers=self.compact_layers,
+            detect_repeats=self.detect_repeats,
+            detect_anomalies=self.detect_anomalies,
+        )
 
 mbe_parser_entry_point = HDF5MBEParserEntryPoint(
     name="hdf5_mbe_parser",
@@ -0,0 +1,210 @@
+from typing import NamedTuple
+
+import numpy as np
+
+# Samples in the trailing window of the rolling mean and variance, and in the
+# leading window whose mean is compared with it to score change points.
+WINDOW = 256
+# Deviation of a sample from the trailing mean, in trailing standard deviations,
+# above which the sample is an outlier, e.g. a pressure burst.
+OUTLIER_THRESHOLD = 8.0
+# Difference of the leading and trailing means, in standard deviations of the two
+# windows, above which a position is a change point, e.g. a reflectivity dropout.
+CHANGE_THRESHOLD = 4.0
+# Events kept per trace, further ones are only counted.
+MAX_EVENTS = 256
+# Lower bound of the standard deviation relative to the mean and the spread of the
+# trace, so that a trace that is constant for a while does not turn every rounding
+# step into an event.
+MIN_RELATIVE_STD = 1e-6
+
+
+def cumulative(values, dtype=np.float64):
+    """Returns the cumulative sums of the values, the sum of the first i at i."""
+    sums = np.empty(len(values) + 1, dtype=dtype)
+    sums[0] = 0
+    np.cumsum(values, out=sums[1:])
+    return sums
+
+
+class AnomalyEvent(NamedTuple):
+    """
+    Anomaly in a trace: `kind` 'outlier' or 'change_point', `direction` 'rise' or
+    'drop', the sample indices of its first, last and most anomalous sample, the
+    value at the peak and the score of the peak in standard deviations.
+    """
+
+    kind: str
+    direction: str
+    start: int
+    end: int
+    peak: int
+    peak_value: float
+    score: float
+
+    def merged(self, other):
+        """Returns the event covering this and a later event, with the higher peak."""
+        peak = self if self.score >= other.score else other
+        kinds = (self.kind, other.kind)
+        kind = 'change_point' if 'change_point' in kinds else 'outlier'
+        return peak._replace(kind=kind, start=self.start, end=other.end)
+
+
+class AnomalyDetector:
+    """
+    Single-pass detector of outliers and change points in a trace that is fed block
+    by block, e.g. as a consumer of `stream_series`.
+
+    Every sample is scored against the rolling mean and standard deviation of the
+    `window` samples before it: as an outlier by its own deviation, and as a change
+    point by the difference of the means of the next and the previous `window`
+    samples, relative to the spread of both. The scores are computed for a whole
+    block at once from cumulative sums, so the detector only keeps the last
+    2 * `window` samples between blocks and at most `max_events` events, whatever
+    the length of the trace. Flagged samples less than a window apart form one
+    event.
+    """
+
+    def __init__(
+        self,
+        window=WINDOW,
+        outlier_threshold=OUTLIER_THRESHOLD,
+        change_threshold=CHANGE_THRESHOLD,
+        max_events=MAX_EVENTS,
+    ):
+        self.window = window
+        self.outlier_threshold = outlier_threshold
+        self.change_threshold = change_threshold
+        self.max_events = max_events
+        self.events = []
+        self.n_dropped = 0
+        # samples kept from the previous blocks and the index of the first of them
+        self.tail = np.empty(0)
+        self.tail_start = 0
+        # index of the next sample to score, its trailing window must be complete
+        self.next = window
+
+    def update(self, block):
+        """Scores the samples of the trace up to one window before the block end."""
+        buffer = np.concatenate([self.tail, block])
+        stop = len(buffer) - self.window + 1
+        start = self.next - self.tail_start
+        if stop > start:
+            self.events, self.n_dropped = self.merge(
+                self.events, *self.score(buffer, start, stop, lookahead=True)
+            )
+            self.next = self.tail_start + stop
+        keep = max(0, self.next - self.tail_start - self.window)
+        self.tail = buffer[keep:]
+        self.tail_start += keep
+
+    def finish(self):
+        """
+        Returns the events of the trace so far and the number of events dropped
+        beyond `max_events`. The last window of samples, which has no leading window
+        yet, is only scored for outliers, and without changing the state, so the
+        trace can still be continued with `update`.
+        """
+        start = self.next - self.tail_start
+        if len(self.tail) <= start:
+            return list(self.events), self.n_dropped
+        return self.merge(
+            self.events, *self.score(self.tail, start, len(self.tail), lookahead=False)
+        )
+
+    def score(self, buffer, start, stop, lookahead):
+        """
+        Returns the events among the samples start to stop of the buffer, with
+        sample indices of the trace, and the number of events that were not
+        resolved because `max_events` are already kept.
+        """
+        window = self.window
+        valid = np.isfinite(buffer)
+        # centering keeps the sums of squares from cancelling out
+        center = float(buffer[valid].mean()) if valid.any() else 0.0
+        shifted = np.where(valid, buffer - center, 0.0)
+        sums = cumulative(shifted)
+        squares = cumulative(shifted * shifted)
+        counts = cumulative(valid, dtype=np.int64)
+
+        # the windows before and after every position, as contiguous slices
+        at = slice(start, stop)
+        before = slice(start - window, stop - window)
+        after = slice(start + window, stop + window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            n_before = counts[at] - counts[before]
+            mean_before = (sums[at] - sums[before]) / n_before
+            variance = (squares[at] - squares[before]) / n_before - mean_before**2
+            std = np.sqrt(np.maximum(variance, 0.0))
+            # the floor also covers the round-off of the cumulative sums
+            scale = np.sqrt(squares[-1] / max(counts[-1], 1))
+            std = np.maximum(
+                std, MIN_RELATIVE_STD * np.maximum(np.abs(mean_before + center), scale)
+            )
+            std[std == 0] = np.finfo(np.float64).tiny
+            deviation = shifted[at] - mean_before
+            outlier_score = np.where(valid[at], np.abs(deviation) / std, 0.0)
+            if lookahead:
+                # a shift has to stand out against the spread of both windows, a
+                # single outlier in the leading window widens it as much as it
+                # shifts it
+                n_after = counts[after] - counts[at]
+                mean_after = (sums[after] - sums[at]) / n_after
+                variance_after = (
+                    squares[after] - squares[at]
+                ) / n_after - mean_after**2
+                spread = np.sqrt(np.maximum((variance + variance_after) / 2, 0.0))
+                spread = np.maximum(spread, std)
+                shift = mean_after - mean_before
+                change_score = np.abs(shift) / spread
+            else:
+                shift = np.zeros(stop - start)
+                change_score = np.zeros(stop - start)
+        # at least half of the trailing window must be valid samples
+        enough = n_before >= window // 2
+        outlier_score = np.where(enough, np.nan_to_num(outlier_score), 0.0)
+        change_score = np.where(enough, np.nan_to_num(change_score), 0.0)
+        is_outlier = outlier_score > self.outlier_threshold
+        is_change = change_score > self.change_threshold
+
+        flagged = np.flatnonzero(is_outlier | is_change)
+        if not len(flagged):
+            return [], 0
+        runs = np.split(flagged, np.flatnonzero(np.diff(flagged) > window) + 1)
+        if len(self.events) >= self.max_events:
+            return [], len(runs)
+        events = []
+        for run in runs:
+            if is_change[run].any():
+                kind, scores, signs = 'change_point', change_score, shift
+            else:
+                kind, scores, signs = 'outlier', outlier_score, deviation
+            peak = run[np.argmax(scores[run])]
+            events.append(
+                AnomalyEvent(
+                    kind,
+                    'rise' if signs[peak] > 0 else 'drop',
+                    self.tail_start + start + int(run[0]),
+                    self.tail_start + start + int(run[-1]),
+                    self.tail_start + start + int(peak),
+                    float(buffer[start + peak]),
+                    float(scores[peak]),
+                )
+            )
+        return events, 0
+
+    def merge(self, events, new_events, n_skipped=0):
+        """
+        Returns the events followed by the new ones, joining those less than a
+        window apart, and the total number of dropped events.
+        """
+        events = list(events)
+        n_dropped = self.n_dropped + n_skipped
+        for event in new_events:
+            if events and event.start - events[-1].end <= self.window:
+                events[-1] = events[-1].merged(event)
+            elif len(events) < self.max_events:
+                events.append(event)
+            else:
+                n_dropped += 1
+        return events, n_dropped
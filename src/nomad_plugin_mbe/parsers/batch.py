@@ -0,0 +1,220 @@
+"""
+Command line tool to parse a directory tree of MBE NeXus files in parallel.
+
+Every `.nxs` file below the input directory is parsed with `HDF5MBEParser` in a
+pool of worker processes and written as one archive file per input file. Files
+with several growth entries get one more archive per further entry, named
+`<name>.<entry>.archive.json`. Finished files are recorded in a checkpoint file,
+so an interrupted run can be resumed with `--resume`, and failed files are
+collected in a failure report. Files without an MBE entry, e.g. NeXus files of
+other experiments, are skipped and written to no archive.
+
+Example:
+    mbe-batch-parse growth_logs/ -o archives/ --format msgpack --workers 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+
+import h5py
+import msgpack
+from nomad import utils
+from nomad.datamodel import EntryArchive
+
+from nomad_plugin_mbe.parsers.mbe_parser import HDF5MBEParser
+
+CHECKPOINT_FILE = '.mbe_batch_checkpoint'
+FAILURES_FILE = 'failures.json'
+ARCHIVE_SUFFIXES = {'json': '.archive.json', 'msgpack': '.archive.msg'}
+# Checkpoint states of a mainfile, files that are done or skipped are not resumed
+DONE = 'done'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
+def find_mainfiles(root):
+    """Returns the paths of all `.nxs` files below root, relative to root."""
+    root = Path(root)
+    return sorted(str(path.relative_to(root)) for path in root.rglob('*.nxs'))
+
+
+def read_checkpoint(output_dir):
+    """Returns the mainfiles that a previous run parsed or skipped."""
+    path = Path(output_dir) / CHECKPOINT_FILE
+    done = set()
+    if path.exists():
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                if record['status'] in (DONE, SKIPPED):
+                    done.add(record['mainfile'])
+    return done
+
+
+def write_archive(archive, path, output_format):
+    """Serializes an archive as JSON or msgpack."""
+    data = archive.m_to_dict()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if output_format == 'msgpack':
+        with open(path, 'wb') as f:
+            msgpack.pack(data, f, use_bin_type=True)
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+
+@lru_cache(maxsize=1)
+def worker_parser():
+    """Returns the parser of the worker process, created once per process."""
+    return HDF5MBEParser()
+
+
+def parse_mainfile(root, mainfile, output_dir, output_format):
+    """
+    Parses one mainfile in a worker process and writes its archives. Returns the
+    mainfile, its checkpoint state and, for failures, the error: the formatted
+    exception, or a message if no MBE entry could be mapped.
+    """
+    parser = worker_parser()
+    try:
+        path = os.path.join(root, mainfile)
+        with h5py.File(path, 'r') as hdf:
+            keys = [name for name, _ in parser.mbe_entries(hdf)]
+        if not keys:
+            return mainfile, SKIPPED, None
+        archive = EntryArchive()
+        child_archives = {key: EntryArchive() for key in keys[1:]}
+        parser.parse(
+            path, archive, utils.get_logger(__name__), child_archives=child_archives
+        )
+        archives = [archive, *child_archives.values()]
+        if any(parsed.data is None for parsed in archives):
+            return mainfile, FAILED, 'No MBE entry could be mapped from the file.'
+        stem = Path(output_dir) / mainfile[: -len('.nxs')]
+        write_archive(
+            archive, Path(f'{stem}{ARCHIVE_SUFFIXES[output_format]}'), output_format
+        )
+        for key, child_archive in child_archives.items():
+            write_archive(
+                child_archive,
+                Path(f'{stem}.{key}{ARCHIVE_SUFFIXES[output_format]}'),
+                output_format,
+            )
+    except Exception:
+        return mainfile, FAILED, traceback.format_exc()
+    return mainfile, DONE, None
+
+
+def run_batch(  # noqa: PLR0913
+    root,
+    output_dir,
+    *,
+    output_format='json',
+    workers=None,
+    resume=False,
+    failures_path=None,
+):
+    """
+    Parses all mainfiles below root with a pool of worker processes. Returns the
+    number of parsed files, the skipped files without an MBE entry and the
+    failures as a mainfile to error mapping.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    mainfiles = find_mainfiles(root)
+    if resume:
+        done = read_checkpoint(output_dir)
+        mainfiles = [mainfile for mainfile in mainfiles if mainfile not in done]
+    else:
+        (output_dir / CHECKPOINT_FILE).unlink(missing_ok=True)
+
+    n_parsed = 0
+    skipped = []
+    failures = {}
+    with open(output_dir / CHECKPOINT_FILE, 'a') as checkpoint:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    parse_mainfile, str(root), mainfile, str(output_dir), output_format
+                )
+                for mainfile in mainfiles
+            ]
+            for future in as_completed(futures):
+                mainfile, status, error = future.result()
+                if status == DONE:
+                    n_parsed += 1
+                elif status == SKIPPED:
+                    skipped.append(mainfile)
+                else:
+                    failures[mainfile] = error
+                record = {'mainfile': mainfile, 'status': status}
+                checkpoint.write(json.dumps(record) + '\n')
+                checkpoint.flush()
+
+    failures_path = Path(failures_path) if failures_path else output_dir / FAILURES_FILE
+    with open(failures_path, 'w') as f:
+        json.dump(
+            [
+                {'mainfile': mainfile, 'error': error}
+                for mainfile, error in sorted(failures.items())
+            ],
+            f,
+            indent=2,
+        )
+    return n_parsed, sorted(skipped), failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Parse a directory tree of MBE NeXus files in parallel.'
+    )
+    parser.add_argument('root', help='directory that is searched for .nxs files')
+    parser.add_argument(
+        '-o', '--output', help='directory for the archives, defaults to root'
+    )
+    parser.add_argument(
+        '--format',
+        choices=sorted(ARCHIVE_SUFFIXES),
+        default='json',
+        help='archive file format',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='number of worker processes, defaults to the CPU count',
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='skip files that a previous run parsed successfully',
+    )
+    parser.add_argument(
+        '--failures',
+        help=f'path of the failure report, defaults to <output>/{FAILURES_FILE}',
+    )
+    args = parser.parse_args(argv)
+
+    n_parsed, skipped, failures = run_batch(
+        args.root,
+        args.output or args.root,
+        output_format=args.format,
+        workers=args.workers,
+        resume=args.resume,
+        failures_path=args.failures,
+    )
+    print(
+        f'Parsed {n_parsed} files, skipped {len(skipped)} without an MBE entry, '
+        f'{len(failures)} failed.'
+    )
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+from functools import cache
+from pathlib import Path
+
+import msgpack
+
+from nomad_plugin_mbe.schema_packages.mbe_schema import m_package
+
+# Fraction of the size limit that eviction shrinks the cache to, so that the
+# directory is not scanned again on every subsequent write.
+EVICTION_TARGET = 0.9
+
+
+@cache
+def schema_fingerprint():
+    """
+    Returns a hash of the MBE schema definitions: names, types, shapes and units of
+    all quantities and the sub-sections of every section. It changes whenever the
+    schema changes, which invalidates the cached parse results.
+    """
+    description = []
+    for section in m_package.section_definitions:
+        quantities = [
+            (quantity.name, str(quantity.type), str(quantity.shape), str(quantity.unit))
+            for quantity in section.all_quantities.values()
+        ]
+        sub_sections = [
+            (
+                sub_section.name,
+                sub_section.sub_section.qualified_name(),
+                sub_section.repeats,
+            )
+            for sub_section in section.all_sub_sections.values()
+        ]
+        description.append((section.name, sorted(quantities), sorted(sub_sections)))
+    return hashlib.sha256(json.dumps(description).encode()).hexdigest()
+
+
+def file_digest(path, block_size=1 << 20):
+    """
+    Returns the SHA-256 of the file contents, read sequentially in blocks. The
+    contents can also be given directly as a bytes-like buffer.
+    """
+    if isinstance(path, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(path).hexdigest()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    On-disk cache of serialized parse results, bounded in size with least recently
+    used eviction.
+
+    Entries are keyed by the content hash of the parsed file together with the
+    parser version, the schema fingerprint and the parser options that affect the
+    result, so a cached archive is only reused if parsing would produce it again.
+    The modification time of an entry is its last use.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._size = None
+
+    def key(self, mainfile, parser_version, options=None):
+        parts = [file_digest(mainfile), str(parser_version), schema_fingerprint()]
+        if options:
+            parts.append(json.dumps(options, sort_keys=True))
+        return hashlib.sha256('/'.join(parts).encode()).hexdigest()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f'{key}.msg'
+
+    def get(self, key):
+        """Returns the cached data for the key or None, marking the entry as used."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = msgpack.unpack(f, raw=False)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # a corrupt entry is removed, an unusable cache directory only skipped
+            with contextlib.suppress(OSError):
+                path.unlink(missing_ok=True)
+            return None
+        return data
+
+    def put(self, key, data, logger=None):
+        """
+        Stores data for the key, evicting old entries beyond the size limit. The
+        cache is optional, so an entry that cannot be written, e.g. on a full disk
+        or without permission, is skipped; the reason is logged if a logger is given.
+        """
+        path = self._path(key)
+        packed = msgpack.packb(data, use_bin_type=True)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # write to a temporary file first, so concurrent readers never see
+            # partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(packed)
+            os.replace(tmp_path, path)
+            tmp_path = None
+
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(packed)
+            if self._size > self.max_bytes:
+                self.evict()
+        except OSError as error:
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
+            if logger is not None:
+                logger.warning(
+                    f'Could not write the parse result to the cache: {error}'
+                )
+
+    def _entries(self):
+        entries = []
+        for path in self.directory.glob('*/*.msg'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Removes the least recently used entries down to the target size."""
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+        self._size = size
@@ -0,0 +1,148 @@
+import io
+import os
+from functools import cache
+
+import h5py
+
+# Files up to this size are read into memory at once by default.
+IN_MEMORY_MAX_BYTES = 64 << 20
+# Raw data chunk cache per open dataset, h5py's default of 1 MiB thrashes as soon
+# as the chunks of a compressed sensor trace are larger than that.
+CHUNK_CACHE_BYTES = 32 << 20
+# Hash table size of the chunk cache, a prime well above the number of chunks
+# that fit into it.
+CHUNK_CACHE_SLOTS = 10007
+
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+
+@cache
+def register_compression_filters():
+    """
+    Registers the third-party compression filters of the optional `hdf5plugin`
+    package, e.g. LZ4, Blosc, Zstd and Bitshuffle, with HDF5. Returns whether the
+    package is installed.
+    """
+    try:
+        import hdf5plugin  # noqa: F401, PLC0415
+    except ImportError:
+        return False
+    return True
+
+
+def missing_filters(dataset):
+    """Returns the names of the compression filters of the dataset HDF5 lacks."""
+    plist = dataset.id.get_create_plist()
+    missing = []
+    for index in range(plist.get_nfilters()):
+        code, _, _, name = plist.get_filter(index)
+        if not h5py.h5z.filter_avail(code):
+            name = name.decode(errors='replace') if isinstance(name, bytes) else name
+            missing.append(name or f'filter {code}')
+    return missing
+
+
+def is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+def source_name(source):
+    """Returns a name of the source for log messages."""
+    if is_path(source):
+        return os.fspath(source)
+    if isinstance(source, BUFFER_TYPES):
+        return f'<buffer of {memoryview(source).nbytes} bytes>'
+    return str(getattr(source, 'name', '<file object>'))
+
+
+class FileAccess:
+    """
+    Settings for reading HDF5 files, applied on every open.
+
+    Files no larger than `in_memory_max_bytes` are loaded with one sequential read
+    and served from memory; on network filesystems this replaces a round trip per
+    small read. Larger files, or all files with a threshold of 0, are read on
+    demand. Every open dataset gets a chunk cache of `chunk_cache_bytes` with
+    `chunk_cache_slots` hash slots, so chunks of compressed traces are decompressed
+    only once, and a `page_buffer_bytes` page buffer serves small metadata reads
+    of files written with the paged file space strategy. With
+    `compression_filters`, the filters of `hdf5plugin` are registered if it is
+    installed.
+    """
+
+    def __init__(
+        self,
+        in_memory_max_bytes=IN_MEMORY_MAX_BYTES,
+        chunk_cache_bytes=CHUNK_CACHE_BYTES,
+        chunk_cache_slots=CHUNK_CACHE_SLOTS,
+        page_buffer_bytes=0,
+        compression_filters=True,
+    ):
+        self.in_memory_max_bytes = in_memory_max_bytes
+        self.chunk_cache_bytes = chunk_cache_bytes
+        self.chunk_cache_slots = chunk_cache_slots
+        self.page_buffer_bytes = page_buffer_bytes
+        if compression_filters:
+            register_compression_filters()
+
+    @property
+    def file_kwargs(self):
+        """Keyword arguments of `h5py.File` for the cache settings."""
+        kwargs = dict(
+            rdcc_nbytes=self.chunk_cache_bytes,
+            rdcc_nslots=self.chunk_cache_slots,
+            rdcc_w0=1.0,
+        )
+        if self.page_buffer_bytes:
+            kwargs['page_buf_size'] = self.page_buffer_bytes
+        return kwargs
+
+    def open(self, source, swmr=False, in_memory=True):
+        """
+        Opens an HDF5 file for reading from a path, a binary file-like object, or a
+        `bytes`, `bytearray` or `memoryview` buffer with the file contents. Returns
+        the file and whether it is held in memory. Files opened for single writer,
+        multiple reader access are never held in memory, they are still growing.
+        Without `in_memory`, files are read on demand whatever their size, e.g.
+        when only a few datasets of them are going to be read.
+        """
+        if isinstance(source, BUFFER_TYPES):
+            return self.open_image(source), True
+        if not is_path(source):
+            return self.open_file_object(source, in_memory)
+        if swmr:
+            return h5py.File(source, 'r', swmr=True, **self.file_kwargs), False
+        max_bytes = self.in_memory_max_bytes if in_memory else 0
+        if max_bytes and os.path.getsize(source) <= max_bytes:
+            hdf = h5py.File(
+                source, 'r', driver='core', backing_store=False, **self.file_kwargs
+            )
+            return hdf, True
+        return h5py.File(source, 'r', **self.file_kwargs), False
+
+    def open_image(self, buffer):
+        """Opens the bytes of an HDF5 file held in memory."""
+        fapl = h5py.h5p.create(h5py.h5p.FILE_ACCESS)
+        fapl.set_fapl_core(backing_store=False)
+        fapl.set_file_image(buffer)
+        fapl.set_cache(0, self.chunk_cache_slots, self.chunk_cache_bytes, 1.0)
+        if self.page_buffer_bytes:
+            fapl.set_page_buffer_size(self.page_buffer_bytes, 0, 0)
+        return h5py.File(h5py.h5f.open(b'image', h5py.h5f.ACC_RDONLY, fapl=fapl))
+
+    def open_file_object(self, fileobj, in_memory=True):
+        """
+        Opens an HDF5 file from a binary file-like object, e.g. a member of a zip
+        archive. Streams that cannot seek, and seekable ones no larger than
+        `in_memory_max_bytes` with `in_memory`, are read completely with one
+        sequential read; others are accessed through the object's read and seek
+        methods.
+        """
+        seekable = getattr(fileobj, 'seekable', None)
+        if seekable is None or not seekable():
+            return self.open_image(fileobj.read()), True
+        size = fileobj.seek(0, io.SEEK_END)
+        fileobj.seek(0)
+        if in_memory and self.in_memory_max_bytes and size <= self.in_memory_max_bytes:
+            return self.open_image(fileobj.read()), True
+        return h5py.File(fileobj, 'r', **self.file_kwargs), False
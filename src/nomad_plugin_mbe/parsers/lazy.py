@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+import h5py
+from nomad.metainfo.util import MSubSectionList
+
+
+class FileHandlePool:
+    """
+    Small pool of open read-only HDF5 files. The least recently used file is
+    closed when more than `max_open` files are requested, and reopened on demand.
+    Files are opened with `open_file(mainfile)`, by default without any options.
+    """
+
+    def __init__(self, max_open=8, open_file=None):
+        self.max_open = max_open
+        self.open_file = open_file or (lambda mainfile: h5py.File(mainfile, 'r'))
+        self._files = OrderedDict()
+
+    def get(self, mainfile):
+        hdf = self._files.get(mainfile)
+        if hdf is not None and hdf.id.valid:
+            self._files.move_to_end(mainfile)
+            return hdf
+        hdf = self.open_file(mainfile)
+        self._files[mainfile] = hdf
+        while len(self._files) > self.max_open:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return hdf
+
+    def close(self):
+        while self._files:
+            _, hdf = self._files.popitem()
+            hdf.close()
+
+
+class LazySubSectionList(MSubSectionList):
+    """
+    Repeating sub-section whose sections are only created when they are accessed.
+
+    Each item is a placeholder until it is read; then `load(hdf_group, index)` is
+    called with the HDF5 group of the item, taken from the file returned by
+    `open_file()`, e.g. a file of a handle pool, and the returned section is added
+    to the parent. Iterating, e.g. to serialize
+    the archive, loads all remaining items.
+    """
+
+    def __init__(self, section, sub_section_def, open_file, paths, load):
+        super().__init__(section, sub_section_def)
+        self._open_file = open_file
+        self._paths = paths
+        self._load = load
+        list.extend(self, [None] * len(paths))
+
+    def _item(self, index):
+        item = list.__getitem__(self, index)
+        if item is None:
+            group = self._open_file()[self._paths[index]]
+            item = self._load(group, index)
+            list.__setitem__(self, index, item)
+            # noinspection PyProtectedMember
+            self.section._on_add_sub_section(self.sub_section_def, item, index)
+        return item
+
+    def __getitem__(self, item):
+        if isinstance(item, int):
+            return self._item(range(len(self))[item])
+        if isinstance(item, slice):
+            return [self._item(index) for index in range(len(self))[item]]
+        return super().__getitem__(item)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._item(index)
+
+    def append(self, value):
+        list.append(self, value)
+        self._paths.append(None)
+        # noinspection PyProtectedMember
+        self.section._on_add_sub_section(self.sub_section_def, value, len(self) - 1)
+
+    @property
+    def loaded(self):
+        """Number of items that have been read from the file."""
+        return sum(item is not None for item in list.__iter__(self))
+
+
+def attach_lazy_sub_sections(section, name, open_file, groups, load):
+    """
+    Attaches the HDF5 groups as the lazily loaded repeating sub-section `name` of
+    the section. Returns the lazy list.
+    """
+    sub_section_def = section.m_def.all_sub_sections[name]
+    paths = [group.name for group in groups]
+    sub_sections = LazySubSectionList(section, sub_section_def, open_file, paths, load)
+    section.__dict__[name] = sub_sections
+    return sub_sections
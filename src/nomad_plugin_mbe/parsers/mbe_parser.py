@@ -17,193 +17,1032 @@ from structlog.stdlib import (
         BoundLogger,
     )
 
+import re
+import math
+from functools import partial
+from typing import IO, Optional, Union
 import h5py
-from datetime import datetime
+import numpy as np
+from datetime import datetime, timezone
 from nomad.parsing import MatchingParser
+from nomad.units import ureg
 from nomad.datamodel import EntryArchive
 from nomad_plugin_mbe.schema_packages.mbe_schema import (
     MBESynthesis, SampleRecipe, SubstrateDescription, User,
     SampleGrowingEnvironment, LayerDescription, SensorDescription,
-    Instruments, CoolingDevice, MaterialSource
+    Instruments, CoolingDevice, MaterialSource, LayerCellArrays, SensorAnomaly
 )
+from nomad_plugin_mbe.parsers.anomalies import AnomalyDetector
+from nomad_plugin_mbe.parsers.cache import ParseCache
+from nomad_plugin_mbe.parsers.files import (
+    BUFFER_TYPES, CHUNK_CACHE_BYTES, CHUNK_CACHE_SLOTS, IN_MEMORY_MAX_BYTES,
+    FileAccess, is_path, missing_filters, source_name
+)
+from nomad_plugin_mbe.parsers.lazy import FileHandlePool, attach_lazy_sub_sections
+from nomad_plugin_mbe.parsers.series import (
+    GrowingArray,
+    RunningStatistics,
+    stream_series,
+)
+from nomad_plugin_mbe.parsers.tracing import (
+    ParseTrace,
+    log_event,
+    record_read,
+    span,
+    traced,
+    tracing,
+    value_nbytes,
+)
+
+# Version of the mapping from HDF5 to the archive. Increase it whenever a change
+# to the parser changes the parse result, to invalidate cached results.
+PARSER_VERSION = 4
+
+
+def decode_string(value):
+    """Converts an HDF5 string value (bytes or str) to a Python string."""
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return str(value)
+
+
+def parse_datetime(value):
+    """Converts an HDF5 datetime string to a Python datetime object."""
+    try:
+        return datetime.fromisoformat(decode_string(value))
+    except ValueError:
+        return None
+
+
+# Application definitions that identify a NeXus file as an MBE growth
+MBE_DEFINITION_RE = r"(?i).*mbe.*"
+
+HDF5_SIGNATURE = b"\x89HDF\r\n\x1a\n"
+# The superblock is at the start of the file or after a user block of 512 * 2^n bytes
+HDF5_SIGNATURE_OFFSETS = (0, 512, 1024, 2048)
+
+
+def has_hdf5_signature(filename, buffer=None):
+    """Checks for the HDF5 superblock signature, in the given file head if possible."""
+    if not buffer or len(buffer) < HDF5_SIGNATURE_OFFSETS[-1] + len(HDF5_SIGNATURE):
+        with open(filename, "rb") as f:
+            buffer = f.read(HDF5_SIGNATURE_OFFSETS[-1] + len(HDF5_SIGNATURE))
+    return any(
+        buffer[offset:offset + len(HDF5_SIGNATURE)] == HDF5_SIGNATURE
+        for offset in HDF5_SIGNATURE_OFFSETS
+    )
+
 
+ENTRY_GROUP_RE = re.compile(r"entry(\d*)")
 
-def parse_datetime(hdf5_obj, key):
-    """Extracts and converts a datetime string from HDF5 to a Python datetime object."""
-    if key in hdf5_obj:
-        value = hdf5_obj[key][()]
-        if isinstance(value, bytes):
-            value = value.decode("utf-8")
+
+def entry_definition(entry):
+    """Returns the application definition of an NXentry group, dataset or attribute."""
+    definition = entry.get("definition")
+    if isinstance(definition, h5py.Dataset):
+        definition = definition[()]
+    else:
+        definition = entry.attrs.get("definition")
+    return decode_string(definition) if definition is not None else None
+
+
+def seconds_between(start, end):
+    """Returns the seconds from start to end, treating naive datetimes as UTC."""
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    return (end - start).total_seconds()
+
+
+def read_time_axis(time_data, start, stop, start_time, logger):
+    """
+    Reads the samples start to stop of a time axis dataset in seconds relative to
+    the start time of the growth, converting from its `units` and `start`
+    attributes.
+    """
+    time = stream_series(time_data, start=start, stop=stop)
+    units = time_data.attrs.get("units")
+    if units is not None:
         try:
-            return datetime.fromisoformat(value)
-        except ValueError:
-            return None
-    return None
+            time *= ureg.Quantity(1, decode_string(units)).to("s").magnitude
+        except Exception:
+            logger.warning(
+                f"Unknown time unit '{decode_string(units)}', assuming seconds."
+            )
+    series_start = time_data.attrs.get("start")
+    if series_start is not None and start_time is not None:
+        series_start = parse_datetime(series_start)
+        if series_start is not None:
+            time += seconds_between(start_time, series_start)
+    return time
 
 
-class HDF5MBEParser(MatchingParser):
+USER_GROUP_RE = re.compile(r"user_(\d+)")
+SENSOR_GROUP_RE = re.compile(r"sensor_(\d+)")
+LAYER_GROUP_RE = re.compile(r"layer(\d+)")
+CELL_GROUP_RE = re.compile(r"cell_(\d+)")
+
+
+def indexed_groups(groups, pattern):
+    """
+    Returns the groups whose name fully matches the pattern, sorted by the numeric
+    index captured by the pattern (e.g. layer9, layer10, layer100).
+    """
+    matches = []
+    for key, group in groups.items():
+        match = pattern.fullmatch(key)
+        if match:
+            matches.append((int(match.group(1)), group))
+    matches.sort(key=lambda item: item[0])
+    return [group for _, group in matches]
+
+
+def sub_section(parent, name, section_cls):
+    """Returns the non-repeating sub-section of the parent, creating it if needed."""
+    section = getattr(parent, name)
+    return section if section is not None else parent.m_create(section_cls)
+
+
+def item_section(parent, name, index, section_cls):
+    """Returns the index-th section of a repeating sub-section, appending if needed."""
+    sections = getattr(parent, name)
+    return sections[index] if index < len(sections) else parent.m_create(section_cls)
+
+
+class SeriesProgress:
+    """Read offset and accumulated arrays and statistics of a recorded time series."""
 
     def __init__(self):
+        self.offset = 0
+        self.value_from_file = None
+        self.statistics = RunningStatistics()
+        self.detector = None
+        self.time = GrowingArray()
+        self.signal = GrowingArray()
+
+
+class ParseProgress:
+    """What has been mapped from a file so far, so a refresh only maps additions."""
+
+    def __init__(self):
+        self.n_users = 0
+        self.n_layers = 0
+        # first layer mapped again, as it may have been incomplete when last read
+        self.layer_start = 0
+        self.sensors = {}
+        # returns the open file from which layers and sensors are loaded lazily, if any
+        self.lazy_file = None
+
+    @property
+    def n_samples(self):
+        return sum(series.offset for series in self.sensors.values())
+
+
+class SectionMapping:
+    """
+    Table mapping the datasets of an HDF5 group onto the quantities of a section.
+
+    The table is built once from the scalar Quantity definitions of the section
+    class: every quantity is read from the dataset with the same name, unless it is
+    renamed, and string, enum and datetime quantities get the matching converter.
+    Array quantities, such as recorded time series, are left to dedicated readers.
+    """
+
+    def __init__(self, section_cls, renames=None):
+        self.section_cls = section_cls
+        self.readers = {}
+        self.string_quantities = set()
+        self.enum_types = {}
+        renames = renames or {}
+        for quantity in section_cls.m_def.all_quantities.values():
+            if quantity.shape:
+                continue
+            key = renames.get(quantity.name, quantity.name)
+            standard_type = quantity.type.standard_type()
+            if standard_type == "datetime":
+                converter = parse_datetime
+            elif standard_type in ("str", "enum"):
+                converter = decode_string
+                self.string_quantities.add(quantity.name)
+                if standard_type == "enum":
+                    self.enum_types[quantity.name] = quantity.type
+            else:
+                converter = None
+            self.readers[key] = (quantity.name, converter)
+
+    def fill(self, section, group):
+        """
+        Fills the section from the datasets of the group in a single pass over its
+        members and returns the subgroups found on the way, by name.
+        """
+        values, subgroups = self.read_values(group)
+        for name, value in values.items():
+            setattr(section, name, value)
+        return subgroups
+
+    def read_values(self, group):
+        """
+        Reads the mapped scalar datasets of the group in a single pass over its
+        members. Returns the converted values by quantity name and the subgroups
+        found on the way, by name.
+        """
+        values = {}
+        subgroups = {}
+        for key, member in group.items():
+            if isinstance(member, h5py.Group):
+                subgroups[key] = member
+                continue
+            reader = self.readers.get(key)
+            if reader is None or member.size > 1:
+                continue
+            name, converter = reader
+            value = member[()]
+            record_read(value_nbytes(value))
+            if converter is not None:
+                value = converter(value)
+            if value is not None:
+                values[name] = value
+        return values, subgroups
+
+    def read_columns(self, group, start=0):
+        """
+        Reads every mapped dataset of a columnar group, where each dataset holds
+        one value per row, with a single read per column, skipping the rows before
+        start. Returns the columns by quantity name, the number of rows and the
+        subgroups of the group.
+        """
+        columns = {}
+        subgroups = {}
+        n_rows = 0
+        for key, member in group.items():
+            if isinstance(member, h5py.Group):
+                subgroups[key] = member
+                continue
+            reader = self.readers.get(key)
+            if reader is None:
+                continue
+            name, converter = reader
+            if member.ndim > 0:
+                values = member[start:]
+                n_rows = max(n_rows, len(values))
+            else:
+                values = member[()]
+            record_read(value_nbytes(values))
+            columns[name] = (values, converter)
+        return columns, n_rows, subgroups
+
+    def fill_rows(self, sections, columns, logger):
+        """
+        Fills one section per row from the columns returned by `read_columns`.
+        Scalar datasets apply to every row, NaN entries are left unset.
+        """
+        n_rows = len(sections)
+        for name, (column, converter) in columns.items():
+            if np.ndim(column) == 0:
+                values = [column if converter is None else converter(column)] * n_rows
+            else:
+                if len(column) != n_rows:
+                    logger.warning(
+                        f"Column '{name}' has {len(column)} rows instead of {n_rows}."
+                    )
+                if converter is None:
+                    values = column.tolist()
+                else:
+                    values = [converter(value) for value in column]
+            for section, value in zip(sections, values):
+                if value is None or (isinstance(value, float) and math.isnan(value)):
+                    continue
+                setattr(section, name, value)
+
+    def missing(self, name, n_rows):
+        """Returns an array quantity of n_rows missing values: empty strings or NaN."""
+        if name in self.string_quantities:
+            return [""] * n_rows
+        return np.full(n_rows, np.nan)
+
+    def enum_values(self, name, values, logger):
+        """
+        Returns the string values of an enum quantity with the values that are not
+        in the enumeration replaced by empty strings, with a warning.
+        """
+        allowed = self.enum_types[name]
+        invalid = sorted({value for value in values if value and value not in allowed})
+        if not invalid:
+            return values
+        logger.warning(
+            f"Values {', '.join(map(repr, invalid))} are not allowed for "
+            f"'{name}' and are left unset."
+        )
+        return [value if value in allowed else "" for value in values]
+
+    def column_arrays(self, columns, n_rows, logger):
+        """
+        Converts the columns returned by `read_columns` to one array per quantity
+        for the compact layer stack: lists of strings, with empty strings for
+        missing values and values outside of an enumeration, and float arrays, with
+        NaN. Scalar datasets apply to every row, columns shorter than n_rows are
+        padded with missing values.
+        """
+        arrays = {}
+        for name, (column, converter) in columns.items():
+            if np.ndim(column) == 0:
+                value = column if converter is None else converter(column)
+                values = [value] * n_rows
+            elif converter is not None:
+                values = [converter(value) for value in column[:n_rows]]
+            else:
+                values = column[:n_rows]
+            array = self.missing(name, n_rows)
+            if name in self.string_quantities:
+                values = ["" if value is None else value for value in values]
+                if name in self.enum_types:
+                    values = self.enum_values(name, values, logger)
+                array[: len(values)] = values
+            else:
+                # None converts to NaN
+                array[: len(values)] = np.array(values, dtype=np.float64)
+            arrays[name] = array
+        return arrays
+
+    def row_arrays(self, rows, logger):
+        """
+        Converts the values returned by `read_values` for several rows, None for
+        missing rows, to arrays.
+        """
+        names = {name for row in rows if row is not None for name in row}
+        columns = {
+            name: ([None if row is None else row.get(name) for row in rows], None)
+            for name in names
+        }
+        return self.column_arrays(columns, len(rows), logger)
+
+    def extend_arrays(self, section, arrays, n_old, n_new, prefix=""):
+        """
+        Appends n_new rows of arrays, as returned by `column_arrays`, to the first
+        n_old rows of the array quantities `prefix + name` of the section, replacing
+        any rows after those. Quantities missing on either side are padded with
+        missing values.
+        """
+        for name, _ in self.readers.values():
+            if prefix + name not in section.m_def.all_quantities:
+                continue
+            old = getattr(section, prefix + name)
+            new = arrays.get(name)
+            if old is None and new is None:
+                continue
+            new = self.missing(name, n_new) if new is None else new
+            if old is None:
+                old = self.missing(name, n_old)
+            elif name in self.string_quantities:
+                old = list(old)[:n_old]
+            else:
+                old = getattr(old, "magnitude", old)
+                old = np.asarray(old, dtype=np.float64)[:n_old]
+            if name in self.string_quantities:
+                values = list(old) + list(new)
+            else:
+                values = np.concatenate([old, new])
+            setattr(section, prefix + name, values)
+
+
+ENTRY_MAPPING = SectionMapping(
+    MBESynthesis, renames={"growth_description": "experiment_description"}
+)
+USER_MAPPING = SectionMapping(User)
+INSTRUMENT_MAPPING = SectionMapping(Instruments)
+CHAMBER_MAPPING = SectionMapping(SampleGrowingEnvironment, renames={"model": "name"})
+COOLING_DEVICE_MAPPING = SectionMapping(CoolingDevice)
+SENSOR_MAPPING = SectionMapping(SensorDescription)
+SAMPLE_MAPPING = SectionMapping(SampleRecipe)
+SUBSTRATE_MAPPING = SectionMapping(SubstrateDescription)
+LAYER_MAPPING = SectionMapping(LayerDescription)
+CELL_MAPPING = SectionMapping(MaterialSource)
+
+
+class HDF5MBEParser(MatchingParser):
+    creates_children = True
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        cache_dir=None,
+        cache_max_bytes=1 << 30,
+        definition_re=MBE_DEFINITION_RE,
+        detailed_trace=False,
+        in_memory_max_bytes=IN_MEMORY_MAX_BYTES,
+        chunk_cache_bytes=CHUNK_CACHE_BYTES,
+        chunk_cache_slots=CHUNK_CACHE_SLOTS,
+        page_buffer_bytes=0,
+        compression_filters=True,
+        compact_layers=False,
+        detect_repeats=False,
+        detect_anomalies=False,
+    ):
         super().__init__(
             name='HDF5MBEParser',
             code_name='MyHDF5MBECode',
             mainfile_name_re=r'.+\.nxs',
             mainfile_mime_re=r'application/x-hdf5'
         )
+        self.cache = ParseCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.file_access = FileAccess(
+            in_memory_max_bytes=in_memory_max_bytes,
+            chunk_cache_bytes=chunk_cache_bytes,
+            chunk_cache_slots=chunk_cache_slots,
+            page_buffer_bytes=page_buffer_bytes,
+            compression_filters=compression_filters,
+        )
+        # lazy parses only read what is accessed, so their files are never read whole
+        self.handles = FileHandlePool(open_file=self.open_on_demand)
+        self.definition_re = re.compile(definition_re)
+        self.detailed_trace = detailed_trace
+        # store layer stacks as arrays on the SampleRecipe, not one section per layer
+        self.compact_layers = compact_layers
+        # replace superlattices in the layer stack by repeat blocks
+        self.detect_repeats = detect_repeats
+        # flag outliers and change points in the sensor traces while they are streamed
+        self.detect_anomalies = detect_anomalies
+        self.last_trace = None
 
-    def parse(self, mainfile: str, archive: EntryArchive, logger) -> None:
-        """Parses the HDF5/NeXus file and maps it to the NOMAD data schema."""
-        logger.info(f"Starting parser for file: {mainfile}")
+    def open_on_demand(self, mainfile):
+        """Opens the file to read only the datasets that are accessed."""
+        return self.file_access.open(mainfile, in_memory=False)[0]
+
+    def is_mainfile(self, filename, mime, buffer, decoded_buffer, compression=None):
+        """
+        Matches by name and mime type first, then sniffs the content: the file must
+        start with an HDF5 superblock and contain an entry whose `definition`
+        dataset (or attribute) matches `definition_re`. Only the superblock and the
+        definitions are read, so other NeXus files, e.g. XRD or ARPES measurements,
+        are rejected without being parsed. For files with several MBE entries, the
+        names of all but the first entry are returned as the keys of child entries.
+        """
+        if not super().is_mainfile(filename, mime, buffer, decoded_buffer, compression):
+            return False
+        if not has_hdf5_signature(filename, buffer):
+            return False
+        try:
+            with h5py.File(filename, "r") as hdf:
+                names = [name for name, _ in self.mbe_entries(hdf)]
+        except Exception:
+            return False
+        if len(names) > 1:
+            return set(names[1:])
+        return len(names) == 1
 
-        with h5py.File(mainfile, "r") as hdf:
-            logger.info("HDF5 file opened successfully")
+    def mbe_entries(self, hdf):
+        """
+        Returns the names and groups of the MBE entries of the file: the `entry` and
+        `entryN` groups, and other groups with the NXentry class, whose definition
+        matches `definition_re`. They are ordered as `entry`, `entry1`, `entry2`, ...
+        followed by the remaining groups by name.
+        """
+        entries = []
+        for name, group in hdf.items():
+            if not isinstance(group, h5py.Group):
+                continue
+            match = ENTRY_GROUP_RE.fullmatch(name)
+            nx_class = decode_string(group.attrs.get("NX_class", ""))
+            if match is None and nx_class != "NXentry":
+                continue
+            definition = entry_definition(group)
+            if definition is None or self.definition_re.fullmatch(definition) is None:
+                continue
+            order = (0, int(match.group(1) or -1), "") if match else (1, 0, name)
+            entries.append((order, name, group))
+        entries.sort(key=lambda item: item[0])
+        return [(name, group) for _, name, group in entries]
 
+    def parsed_entries(self, hdf):
+        """
+        Returns the entries that parsing maps: the MBE entries, or an `entry` group
+        without a definition in files that were not matched by `is_mainfile`.
+        """
+        entries = self.mbe_entries(hdf)
+        entry = hdf.get("entry")
+        if not entries and isinstance(entry, h5py.Group):
+            # an entry of another application definition, e.g. NXxrd, is not mapped
+            if entry_definition(entry) is None:
+                entries = [("entry", entry)]
+        return entries
+
+    def parse(
+        self,
+        mainfile: Union[str, IO[bytes], bytes, memoryview],
+        archive: EntryArchive,
+        logger,
+        child_archives: Optional[dict[str, EntryArchive]] = None,
+    ) -> None:
+        """
+        Parses the HDF5/NeXus file and maps it to the NOMAD data schema. Besides a
+        path, the file can be given as a binary file-like object, e.g. a member of a
+        zip or tar archive, or as a `bytes` or `memoryview` buffer with its contents,
+        so bundles are parsed without extracting them to disk first.
+
+        The first MBE entry of the file is mapped to the archive and every further
+        entry, e.g. one per growth of a day, to the child archive of its name, all
+        from one open of the file. Emits one structured summary event with the
+        timings per section type and the number of datasets and bytes read; the
+        trace is also kept as `last_trace`.
+        """
+        name = source_name(mainfile)
+        logger.info(f"Starting parser for file: {name}")
+        trace = self.last_trace = ParseTrace(detailed=self.detailed_trace)
+        with tracing(trace):
+            self._parse(mainfile, archive, logger, trace, child_archives or {})
+        log_event(
+            logger, "HDF5MBEParser.parse summary", mainfile=name, **trace.summary()
+        )
+
+    def cache_options(self, child_archives):
+        """Returns the non-default options that change the result, for cache keys."""
+        options = {}
+        if child_archives:
+            options["children"] = sorted(child_archives)
+        if self.compact_layers:
+            options["compact_layers"] = True
+        if self.detect_repeats:
+            options["detect_repeats"] = True
+        if self.detect_anomalies:
+            options["detect_anomalies"] = True
+        if self.definition_re.pattern != MBE_DEFINITION_RE:
+            options["definition_re"] = self.definition_re.pattern
+        return options
+
+    def _parse(self, mainfile, archive, logger, trace, child_archives):
+        cache_key = None
+        # file objects are not cached, their contents would have to be read twice
+        cacheable = is_path(mainfile) or isinstance(mainfile, BUFFER_TYPES)
+        if self.cache is not None and cacheable:
+            options = self.cache_options(child_archives)
+            cache_key = self.cache.key(mainfile, PARSER_VERSION, options)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                archive.data = MBESynthesis.m_from_dict(cached["data"])
+                for key, data in cached.get("children", {}).items():
+                    child_archives[key].data = MBESynthesis.m_from_dict(data)
+                trace.cache_hit = True
+                logger.debug("Parse result restored from cache.")
+                return
+
+        with span("file_open"):
+            hdf, trace.in_memory = self.file_access.open(mainfile)
+        trace.file_open_seconds = trace.section_seconds["file_open"]
+        with hdf:
+            entries = self.parsed_entries(hdf)
+            if not entries:
+                logger.error(
+                    "The file contains no entry with an MBE application definition."
+                )
+                return
+            (_, main_entry), *child_entries = entries
             # Create main metadata structure
             archive.data = MBESynthesis()
-            entry = archive.data
-            entry_data = hdf["entry"]
-            logger.info("Parsing general metadata")
-
-            # Extract general metadata
-            entry.definition = entry_data["definition"][()].decode("utf-8") if "definition" in entry_data else None
-            entry.title = entry_data["title"][()].decode("utf-8") if "title" in entry_data else None
-            entry.growth_description = entry_data["experiment_description"][()].decode("utf-8") if "experiment_description" in entry_data else None
-
-            # Extract timestamps
-            entry.start_time = parse_datetime(entry_data, "start_time")
-            entry.end_time = parse_datetime(entry_data, "end_time")
-            entry.duration = entry_data["duration"][()] if "duration" in entry_data else None
-
-            # Extract user information
-            if "user" in entry_data:
-                user_data = entry_data["user"]
-                user = entry.m_create(User)
-                logger.info("Parsing user information")
-
-                user.name = user_data["name"][()].decode("utf-8") if "name" in user_data else None
-                user.email = user_data["email"][()].decode("utf-8") if "email" in user_data else None
-                user.role = user_data["role"][()].decode("utf-8") if "role" in user_data else None
-                user.affiliation = user_data["affiliation"][()].decode("utf-8") if "affiliation" in user_data else None
-                user.ORCID = user_data["ORCID"][()].decode("utf-8") if "ORCID" in user_data else None
-            else:
-                max_user = 5
-                user_index = 1
-                while user_index < max_user and f"user_{user_index}" in entry_data:
-                    user_data = entry_data[f"user_{user_index}"]
-                    user = entry.m_create(User)
-                    logger.info("Parsing user information")
-
-                    user.name = user_data["name"][()].decode("utf-8") if "name" in user_data else None
-                    user.email = user_data["email"][()].decode("utf-8") if "email" in user_data else None
-                    user.role = user_data["role"][()].decode("utf-8") if "role" in user_data else None
-                    user.affiliation = user_data["affiliation"][()].decode("utf-8") if "affiliation" in user_data else None
-                    user.ORCID = user_data["ORCID"][()].decode("utf-8") if "ORCID" in user_data else None
-
-                    user_index += 1
-
-            # Extract apparatus information
-            if "instrument" in entry_data:
-                instrument_data = entry_data["instrument"]
-                instrument = entry.m_create(Instruments)
-                logger.info("Parsing instrument information")
-
-                # Extract chamber information
-                if "chamber" in instrument_data:
-                    chamber_data = instrument_data["chamber"]
-                    chamber = instrument.m_create(SampleGrowingEnvironment)
-                    logger.info("Parsing chamber information")
-
-                    chamber.model = chamber_data["name"][()].decode("utf-8") if "name" in chamber_data else None
-                    chamber.type = chamber_data["type"][()].decode("utf-8") if "type" in chamber_data else None
-                    chamber.description = chamber_data["description"][()].decode("utf-8") if "description" in chamber_data else None
-                    chamber.program = chamber_data["program"][()].decode("utf-8") if "program" in chamber_data else None
-
-                    # Extract cooling device information
-                    if "cooling_device" in chamber_data:
-                        device_data = chamber_data["cooling_device"]
-                        device = chamber.m_create(CoolingDevice)
-                        logger.info("Parsing cooling device information")
-
-                        device.name = device_data["name"][()].decode("utf-8") if "name" in device_data else None
-                        device.model = device_data["model"][()].decode("utf-8") if "model" in device_data else None
-                        device.cooling_mode = device_data["cooling_mode"][()].decode("utf-8") if "cooling_mode" in device_data else None
-                        device.temperature = device_data["temperature"][()] if "temperature" in device_data else None
-
-                    # Extract sensors information
-                    max_sensor = 8
-                    sensor_index = 1
-                    while sensor_index < max_sensor and f"sensor_{sensor_index}" in chamber_data:
-                        sensor_data = chamber_data[f"sensor_{sensor_index}"]
-                        sensor = chamber.m_create(SensorDescription)
-                        logger.info("Parsing sensor information")
-
-                        sensor.name = sensor_data["name"][()].decode("utf-8") if "name" in sensor_data else None
-                        sensor.model = sensor_data["model"][()].decode("utf-8") if "model" in sensor_data else None
-                        sensor.measurement = sensor_data["measurement"][()].decode("utf-8") if "measurement" in sensor_data else None
-                        sensor.value = sensor_data["value"][()] if "value" in sensor_data else None
-
-                        sensor_index += 1
-
-            # Extract sample recipe
-            if "sample" in entry_data:
-                sample_data = entry_data["sample"]
-                sample = entry.m_create(SampleRecipe)
-                logger.info("Parsing sample recipe information")
-
-                sample.name = sample_data["name"][()].decode("utf-8") if "name" in sample_data else None
-                sample.thickness = sample_data["thickness"][()] if "thickness" in sample_data else None
-
-                # Extract substrate details
-                if "substrate" in sample_data:
-                    substrate_data = sample_data["substrate"]
-                    substrate = sample.m_create(SubstrateDescription)
-                    logger.info("Parsing substrate information")
-
-                    substrate.name = substrate_data["name"][()].decode("utf-8") if "name" in substrate_data else None
-                    substrate.chemical_formula = substrate_data["chemical_formula"][()].decode("utf-8") if "chemical_formula" in substrate_data else None
-                    substrate.crystalline_structure = substrate_data["crystalline_structure"][()].decode("utf-8") if "crystalline_structure" in substrate_data else None
-                    substrate.crystal_orientation = substrate_data["crystal_orientation"][()].decode("utf-8") if "crystal_orientation" in substrate_data else None
-                    substrate.doping = substrate_data["doping"][()].decode("utf-8") if "doping" in substrate_data else None
-                    substrate.diameter = substrate_data["diameter"][()] if "diameter" in substrate_data else None
-                    substrate.thickness = substrate_data["thickness"][()] if "thickness" in substrate_data else None
-                    substrate.area = substrate_data["area"][()] if "area" in substrate_data else None
-                    substrate.flat_convention = substrate_data["flat_convention"][()].decode("utf-8") if "flat_convention" in substrate_data else None
-                    substrate.holder = substrate_data["holder"][()].decode("utf-8") if "holder" in substrate_data else None
-
-                # Extract growth layers
-                max_layer = 200
-                layer_index = 1
-                while layer_index < max_layer and f"layer{layer_index:02d}" in sample_data:
-                    layer_data = sample_data[f"layer{layer_index:02d}"]
-                    layer = sample.m_create(LayerDescription)
-                    logger.info("Parsing layer information")
-
-                    layer.name = layer_data["name"][()].decode("utf-8") if "name" in layer_data else None
-                    layer.chemical_formula = layer_data["chemical_formula"][()].decode("utf-8") if "chemical_formula" in layer_data else None
-                    layer.doping = layer_data["doping"][()] if "doping" in layer_data else None
-                    layer.alloy_fraction = layer_data["alloy_fraction"][()] if "alloy_fraction" in layer_data else None
-                    layer.thickness = layer_data["thickness"][()] if "thickness" in layer_data else None
-                    layer.growth_temperature = layer_data["growth_temperature"][()] if "growth_temperature" in layer_data else None
-                    layer.growth_time = layer_data["growth_time"][()] if "growth_time" in layer_data else None
-                    layer.growth_rate = layer_data["growth_rate"][()] if "growth_rate" in layer_data else None
-                    layer.rotational_frequency = layer_data["rotational_frequency"][()] if "rotational_frequency" in layer_data else None
-
-                    max_cell = 5
-                    cell_index = 1
-                    while cell_index < max_cell and f"cell_{cell_index}" in layer_data:
-                        cell_data = layer_data[f"cell_{cell_index}"]
-                        cell = layer.m_create(MaterialSource)
-                        logger.info("Parsing cell information")
-
-                        cell.name = cell_data["name"][()].decode("utf-8") if "name" in cell_data else None
-                        cell.model = cell_data["model"][()].decode("utf-8") if "model" in cell_data else None
-                        cell.type = cell_data["type"][()].decode("utf-8") if "type" in cell_data else None
-                        cell.shutter_status = cell_data["shutter_status"][()].decode("utf-8") if "shutter_status" in cell_data else None
-                        cell.partial_growth_rate = cell_data["partial_growth_rate"][()] if "partial_growth_rate" in cell_data else None
-                        cell.partial_pressure = cell_data["partial_pressure"][()] if "partial_pressure" in cell_data else None
-
-                        cell_index += 1
-
-                    layer_index += 1
-
-            logger.info("HDF5 file successfully parsed into NOMAD schema.")
\ No newline at end of file
+            self.parse_entry(main_entry, archive.data, logger)
+            self.compress_repeats(archive.data, logger)
+            for key, entry_data in child_entries:
+                child_archive = child_archives.get(key)
+                if child_archive is not None:
+                    child_archive.data = MBESynthesis()
+                    self.parse_entry(entry_data, child_archive.data, logger)
+                    self.compress_repeats(child_archive.data, logger)
+            missing = set(child_archives) - {key for key, _ in child_entries}
+            if missing:
+                logger.warning(
+                    f"No MBE entries {', '.join(sorted(missing))} "
+                    "for the child archives."
+                )
+
+        if cache_key is not None:
+            children = {
+                key: child_archive.data.m_to_dict()
+                for key, child_archive in child_archives.items()
+                if child_archive.data is not None
+            }
+            self.cache.put(
+                cache_key,
+                {"data": archive.data.m_to_dict(), "children": children},
+                logger,
+            )
+
+    @traced("repeats")
+    def compress_repeats(self, data, logger):
+        """With `detect_repeats`, replaces the superlattices by repeat blocks."""
+        if self.detect_repeats and data.sample is not None:
+            n_blocks = data.sample.compress_layer_repeats()
+            logger.debug(f"Found {n_blocks} repeated layer periods.")
+
+    def parse_lazy(self, mainfile: str, archive: EntryArchive, logger) -> None:
+        """
+        Maps the metadata of the file, e.g. title, times, users and substrate, but
+        attaches the layers and sensors as lazy lists: each LayerDescription or
+        SensorDescription, with its cells or recorded time series, is only read from
+        its HDF5 group when it is first accessed, through the pool of open files.
+        """
+        hdf = self.handles.get(mainfile)
+        entries = self.parsed_entries(hdf)
+        if not entries:
+            logger.error(
+                "The file contains no entry with an MBE application definition."
+            )
+            return
+        (_, entry_data), *_ = entries
+        archive.data = MBESynthesis()
+        progress = ParseProgress()
+        progress.lazy_file = partial(self.handles.get, mainfile)
+        self.parse_entry(entry_data, archive.data, logger, progress)
+
+    def follow(self, mainfile, archive, logger, entry=None):
+        """
+        Returns a follower that incrementally parses a growth still being written,
+        the entry of the given key or by default the first MBE entry of the file.
+        """
+        return MBEGrowthFollower(self, mainfile, archive, logger, entry)
+
+    @traced("entry")
+    def parse_entry(self, entry_data, entry, logger, progress=None):
+        """
+        Maps an NXentry group onto an MBESynthesis section. With the progress of a
+        previous call, existing sections are reused and only users, layers and
+        sensor samples that were added to the file since then are mapped.
+        """
+        progress = progress or ParseProgress()
+        logger.debug("Parsing general metadata")
+        groups = ENTRY_MAPPING.fill(entry, entry_data)
+
+        # Extract user information
+        if "user" in groups:
+            user_groups = [groups["user"]]
+        else:
+            user_groups = indexed_groups(groups, USER_GROUP_RE)
+
+        for user_data in user_groups[progress.n_users:]:
+            logger.debug("Parsing user information")
+            with span("user"):
+                USER_MAPPING.fill(entry.m_create(User), user_data)
+        progress.n_users = max(progress.n_users, len(user_groups))
+
+        # Extract apparatus information
+        if "instrument" in groups:
+            logger.debug("Parsing instrument information")
+            instrument = sub_section(entry, "instrument", Instruments)
+            self.parse_instrument(
+                groups["instrument"], instrument, entry.start_time, logger, progress
+            )
+
+        # Extract sample recipe
+        if "sample" in groups:
+            logger.debug("Parsing sample recipe information")
+            sample = sub_section(entry, "sample", SampleRecipe)
+            self.parse_sample(groups["sample"], sample, logger, progress)
+
+    @traced("instrument")
+    def parse_instrument(
+        self, instrument_data, instrument, start_time, logger, progress
+    ):
+        """Maps the instrument group, i.e. the chamber with its devices and sensors."""
+        instrument_groups = INSTRUMENT_MAPPING.fill(instrument, instrument_data)
+        if "chamber" not in instrument_groups:
+            return
+
+        logger.debug("Parsing chamber information")
+        chamber = sub_section(instrument, "chamber", SampleGrowingEnvironment)
+        chamber_groups = CHAMBER_MAPPING.fill(chamber, instrument_groups["chamber"])
+
+        # Extract cooling device information
+        if "cooling_device" in chamber_groups:
+            logger.debug("Parsing cooling device information")
+            with span("cooling_device"):
+                device = sub_section(chamber, "cooling_device", CoolingDevice)
+                COOLING_DEVICE_MAPPING.fill(device, chamber_groups["cooling_device"])
+
+        # Extract sensors information
+        sensor_groups = indexed_groups(chamber_groups, SENSOR_GROUP_RE)
+        if progress.lazy_file is not None:
+            def load_sensor(sensor_data, index):
+                sensor = SensorDescription()
+                self.parse_sensor(sensor_data, sensor, start_time, logger)
+                return sensor
+
+            attach_lazy_sub_sections(
+                chamber, "sensor", progress.lazy_file, sensor_groups, load_sensor
+            )
+            return
+
+        for index, sensor_data in enumerate(sensor_groups):
+            logger.debug("Parsing sensor information")
+            sensor = item_section(chamber, "sensor", index, SensorDescription)
+            series = progress.sensors.setdefault(index, SeriesProgress())
+            self.parse_sensor(sensor_data, sensor, start_time, logger, series)
+
+    @traced("sensor")
+    def parse_sensor(self, sensor_data, sensor, start_time, logger, series=None):
+        """
+        Maps a sensor group. A recorded time series, given either as 1-D `value` and
+        `time` datasets or as an NXlog `value_log` group, is streamed block by block
+        into the `time` and `signal` arrays while its statistics are accumulated.
+        Only the samples after the offset of the series progress are read.
+        """
+        series = series or SeriesProgress()
+        sensor_groups = SENSOR_MAPPING.fill(sensor, sensor_data)
+        if series.value_from_file is None:
+            series.value_from_file = sensor.value is not None
+        series_data = sensor_groups.get("value_log", sensor_data)
+        # warnings are only given once, on the first read of the series
+        value_data, time_data = self.series_datasets(
+            series_data, sensor.name, logger if series.offset == 0 else None
+        )
+        if value_data is None:
+            return
+        # while a growth is written, the time axis and the values may differ in length
+        stop = value_data.shape[0]
+        if time_data is not None:
+            stop = min(stop, time_data.shape[0])
+        if stop <= series.offset:
+            return
+
+        consumers = [series.statistics]
+        if self.detect_anomalies:
+            if series.detector is None:
+                series.detector = AnomalyDetector()
+            consumers.append(series.detector)
+        series.signal.extend(stream_series(value_data, consumers, series.offset, stop))
+        statistics = series.statistics
+        sensor.signal = series.signal.values
+        sensor.sample_count = statistics.count
+        if statistics.count:
+            if not series.value_from_file:
+                sensor.value = statistics.mean
+            sensor.value_min = statistics.minimum
+            sensor.value_max = statistics.maximum
+            sensor.value_std = statistics.std
+
+        if time_data is not None:
+            series.time.extend(
+                read_time_axis(time_data, series.offset, stop, start_time, logger)
+            )
+            sensor.time = series.time.values
+        series.offset = stop
+        if series.detector is not None:
+            self.attach_anomalies(sensor, series)
+
+    @staticmethod
+    def series_datasets(series_data, name, logger=None):
+        """
+        Returns the 1-D value and time datasets of a recorded time series, with None
+        for a missing time axis and for both if the values cannot be read: they are
+        missing, compressed with an unavailable filter, or the values or times are
+        not numeric. The reasons are logged if a logger is given.
+        """
+        value_data = series_data.get("value")
+        if not isinstance(value_data, h5py.Dataset) or value_data.ndim != 1:
+            return None, None
+        if value_data.size <= 1:
+            return None, None
+        missing = missing_filters(value_data)
+        if missing:
+            if logger is not None:
+                logger.warning(
+                    f"Sensor '{name}' time series needs the unavailable compression "
+                    f"filters {', '.join(missing)}, install hdf5plugin to read it."
+                )
+            return None, None
+
+        time_data = series_data.get("time")
+        if not isinstance(time_data, h5py.Dataset) or time_data.ndim != 1:
+            time_data = None
+            if logger is not None:
+                logger.warning(f"Sensor '{name}' has no time axis for its time series.")
+        for data in (value_data, time_data):
+            if data is not None and not np.issubdtype(data.dtype, np.number):
+                if logger is not None:
+                    logger.warning(
+                        f"Sensor '{name}' time series has non-numeric "
+                        f"'{data.name.rsplit('/', 1)[-1]}' of type {data.dtype}, "
+                        "skipping it."
+                    )
+                return None, None
+        return value_data, time_data
+
+    def attach_anomalies(self, sensor, series):
+        """Sets the anomalies found in the signal so far, with times if known."""
+        events, n_dropped = series.detector.finish()
+        time = series.time.values if series.time.size else None
+        anomalies = []
+        for event in events:
+            anomaly = SensorAnomaly(
+                kind=event.kind,
+                direction=event.direction,
+                start_index=event.start,
+                end_index=event.end,
+                peak_value=event.peak_value,
+                score=event.score,
+            )
+            if time is not None and event.end < len(time):
+                anomaly.start_time = time[event.start]
+                anomaly.end_time = time[event.end]
+                anomaly.peak_time = time[event.peak]
+            anomalies.append(anomaly)
+        sensor.anomaly = anomalies
+        sensor.n_dropped_anomalies = n_dropped or None
+
+    @traced("sample")
+    def parse_sample(self, sample_data, sample, logger, progress=None):
+        """Maps the sample group, i.e. the substrate and the stack of grown layers."""
+        progress = progress or ParseProgress()
+        sample_groups = SAMPLE_MAPPING.fill(sample, sample_data)
+
+        # Extract substrate details
+        if "substrate" in sample_groups:
+            logger.debug("Parsing substrate information")
+            with span("substrate"):
+                substrate = sub_section(sample, "substrate", SubstrateDescription)
+                SUBSTRATE_MAPPING.fill(substrate, sample_groups["substrate"])
+
+        # Extract growth layers, stored as parallel arrays or one group per layer.
+        # Layers that may still have been written when last read are mapped again.
+        start = progress.layer_start
+        if "layers" in sample_groups:
+            n_layers, n_complete = self.parse_layer_columns(
+                sample_groups["layers"], sample, logger, start
+            )
+            progress.n_layers = max(progress.n_layers, start + n_layers)
+            progress.layer_start = start + n_complete
+            return
+
+        layer_groups = indexed_groups(sample_groups, LAYER_GROUP_RE)
+        if self.compact_layers:
+            self.parse_layer_stack(layer_groups[start:], sample, logger, start)
+        elif progress.lazy_file is not None:
+            def load_layer(layer_data, index):
+                layer = LayerDescription()
+                self.parse_layer(layer_data, layer, logger)
+                return layer
+
+            attach_lazy_sub_sections(
+                sample, "layer", progress.lazy_file, layer_groups, load_layer
+            )
+        else:
+            for index, layer_data in enumerate(layer_groups[start:], start):
+                layer = item_section(sample, "layer", index, LayerDescription)
+                self.parse_layer(layer_data, layer, logger)
+        progress.n_layers = max(progress.n_layers, len(layer_groups))
+        progress.layer_start = max(len(layer_groups) - 1, 0)
+
+    @traced("layer")
+    def parse_layer(self, layer_data, layer, logger):
+        """Maps a layerNN group and its cells onto a LayerDescription section."""
+        logger.debug("Parsing layer information")
+        cell_groups = LAYER_MAPPING.fill(layer, layer_data)
+
+        for index, cell_data in enumerate(indexed_groups(cell_groups, CELL_GROUP_RE)):
+            logger.debug("Parsing cell information")
+            with span("cell"):
+                cell = item_section(layer, "cell", index, MaterialSource)
+                CELL_MAPPING.fill(cell, cell_data)
+
+    @traced("layer_columns")
+    def parse_layer_columns(self, layers_data, sample, logger, start=0):
+        """
+        Maps a columnar layer stack, where `sample/layers` holds one array per layer
+        quantity (e.g. `thickness[N]`) and `sample/layers/cell_K` one array per cell
+        quantity, onto LayerDescription and MaterialSource sections, or with
+        `compact_layers` onto the layer arrays of the sample. Only the rows after
+        start are mapped, onto the existing layers where there are any. Returns the
+        number of mapped layers and the number of those that have a value in every
+        column, the others may still be written.
+        """
+        logger.debug("Parsing columnar layer information")
+        columns, n_layers, layers_groups = LAYER_MAPPING.read_columns(
+            layers_data, start
+        )
+        cell_columns = [
+            CELL_MAPPING.read_columns(cell_data, start)[0]
+            for cell_data in indexed_groups(layers_groups, CELL_GROUP_RE)
+        ]
+        n_complete = min(
+            (
+                len(values)
+                for table in [columns, *cell_columns]
+                for values, _ in table.values()
+                if np.ndim(values)
+            ),
+            default=n_layers,
+        )
+        if self.compact_layers:
+            layers = LAYER_MAPPING.column_arrays(columns, n_layers, logger)
+            cells = [
+                CELL_MAPPING.column_arrays(table, n_layers, logger)
+                for table in cell_columns
+            ]
+            self.extend_layer_stack(sample, layers, cells, start, n_layers)
+            return n_layers, n_complete
+
+        layers = [
+            item_section(sample, "layer", index, LayerDescription)
+            for index in range(start, start + n_layers)
+        ]
+        LAYER_MAPPING.fill_rows(layers, columns, logger)
+
+        for index, table in enumerate(cell_columns):
+            cells = [
+                item_section(layer, "cell", index, MaterialSource) for layer in layers
+            ]
+            CELL_MAPPING.fill_rows(cells, table, logger)
+        return n_layers, n_complete
+
+    @traced("layer_stack")
+    def parse_layer_stack(self, layer_groups, sample, logger, start=0):
+        """
+        Maps layerNN groups and their cells onto the compact layer arrays of the
+        sample, `layer_thickness`, ... and one LayerCellArrays per cell, after the
+        first start layers. Returns the number of mapped layers.
+        """
+        logger.debug("Parsing layer information into arrays")
+        layer_rows = []
+        cell_rows = []
+        for layer_data in layer_groups:
+            values, subgroups = LAYER_MAPPING.read_values(layer_data)
+            layer_rows.append(values)
+            cell_rows.append([
+                CELL_MAPPING.read_values(cell_data)[0]
+                for cell_data in indexed_groups(subgroups, CELL_GROUP_RE)
+            ])
+        n_cells = max((len(cells) for cells in cell_rows), default=0)
+        cells = [
+            CELL_MAPPING.row_arrays(
+                [cells[index] if index < len(cells) else None for cells in cell_rows],
+                logger,
+            )
+            for index in range(n_cells)
+        ]
+        layers = LAYER_MAPPING.row_arrays(layer_rows, logger)
+        self.extend_layer_stack(sample, layers, cells, start, len(layer_rows))
+        return len(layer_rows)
+
+    def extend_layer_stack(self, sample, layers, cells, start, n_layers):
+        """
+        Appends n_layers layers, given as arrays per quantity, to the compact layer
+        stack of start layers.
+        """
+        if n_layers == 0:
+            return
+        LAYER_MAPPING.extend_arrays(sample, layers, start, n_layers, prefix="layer_")
+        while len(sample.layer_cell) < len(cells):
+            sample.m_create(LayerCellArrays)
+        for index, cell_arrays in enumerate(sample.layer_cell):
+            arrays = cells[index] if index < len(cells) else {}
+            CELL_MAPPING.extend_arrays(cell_arrays, arrays, start, n_layers)
+
+
+class MBEGrowthFollower:
+    """
+    Follows an MBE NeXus file while the growth is still being written.
+
+    Every refresh opens the file in SWMR read mode, so the control software can
+    keep appending to it, and maps only what was added since the previous refresh:
+    new layers are appended to the SampleRecipe and new sensor samples to the
+    recorded time series. Layers that may still have been written at the previous
+    refresh, the last layer group or the rows missing from some of the layer
+    columns, are mapped again. The cost of a refresh is therefore proportional to the
+    new data, not to the size of the file. The followed entry is the one of the
+    given key or the first MBE entry; refreshes before it is written map nothing.
+
+    Example:
+        follower = HDF5MBEParser().follow(mainfile, archive, logger)
+        while growing:
+            new_layers, new_samples = follower.refresh()
+    """
+
+    def __init__(self, parser, mainfile, archive, logger, entry=None):
+        self.parser = parser
+        self.mainfile = mainfile
+        self.archive = archive
+        self.logger = logger
+        self.entry = entry
+        self.progress = ParseProgress()
+
+    def refresh(self):
+        """
+        Maps the data added since the last refresh. Returns the number of new layers
+        and samples.
+        """
+        n_layers = self.progress.n_layers
+        n_samples = self.progress.n_samples
+        hdf, _ = self.parser.file_access.open(self.mainfile, swmr=True)
+        with hdf:
+            if self.entry is None:
+                # the entry is chosen once, entries written later must not replace it
+                entries = self.parser.parsed_entries(hdf)
+                if not entries:
+                    return 0, 0
+                self.entry = entries[0][0]
+            entry_data = hdf.get(self.entry)
+            if not isinstance(entry_data, h5py.Group):
+                return 0, 0
+            if self.archive.data is None:
+                self.archive.data = MBESynthesis()
+            self.parser.parse_entry(
+                entry_data, self.archive.data, self.logger, self.progress
+            )
+        return self.progress.n_layers - n_layers, self.progress.n_samples - n_samples
@@ -0,0 +1,106 @@
+import numpy as np
+
+from nomad_plugin_mbe.parsers.tracing import record_read
+
+# Upper bound on the number of samples read from a sensor trace at once.
+MAX_BLOCK_SAMPLES = 1 << 20
+
+
+def iter_blocks(dataset, start=0, stop=None, max_block=MAX_BLOCK_SAMPLES):
+    """
+    Yields slices covering the samples from start to stop of a 1-D dataset in
+    order. The slices follow the chunk layout of the dataset: each block is a whole
+    number of chunks, so every chunk is decompressed exactly once, and at most
+    `max_block` samples long.
+    """
+    stop = dataset.shape[0] if stop is None else stop
+    if dataset.chunks:
+        chunk = dataset.chunks[0]
+        block = chunk * max(1, max_block // chunk)
+    else:
+        block = max_block
+    while start < stop:
+        end = min((start // block + 1) * block, stop)
+        yield slice(start, end)
+        start = end
+
+
+class RunningStatistics:
+    """
+    Single-pass count, mean, standard deviation, minimum and maximum of a stream
+    of blocks, merged block by block with the parallel variance formula.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    def update(self, block):
+        block = block[~np.isnan(block)]
+        if block.size == 0:
+            return
+        count = block.size
+        mean = float(block.mean())
+        m2 = float(((block - mean) ** 2).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, float(block.min()))
+        self.maximum = max(self.maximum, float(block.max()))
+
+    @property
+    def std(self):
+        return (self.m2 / self.count) ** 0.5 if self.count else None
+
+
+class GrowingArray:
+    """
+    1-D float array that is appended to in place, doubling its capacity when full,
+    so that repeatedly appending samples costs linear time overall.
+    """
+
+    def __init__(self):
+        self._data = np.empty(0, dtype=np.float64)
+        self.size = 0
+
+    def extend(self, values):
+        if self.size == 0:
+            # adopt the first block instead of copying it
+            self._data = values
+            self.size = len(values)
+            return
+        end = self.size + len(values)
+        if end > len(self._data):
+            data = np.empty(max(end, 2 * len(self._data)), dtype=np.float64)
+            data[: self.size] = self._data[: self.size]
+            self._data = data
+        self._data[self.size : end] = values
+        self.size = end
+
+    @property
+    def values(self):
+        return self._data[: self.size]
+
+
+def stream_series(
+    dataset, consumers=(), start=0, stop=None, max_block=MAX_BLOCK_SAMPLES
+):
+    """
+    Reads the samples from start to stop of a 1-D dataset block by block straight
+    into a preallocated float array, so no intermediate copy of the trace is made,
+    and feeds every block to the `update` method of the consumers. Returns the array.
+    """
+    stop = dataset.shape[0] if stop is None else stop
+    values = np.empty(stop - start, dtype=np.float64)
+    for block in iter_blocks(dataset, start, stop, max_block):
+        dest = slice(block.start - start, block.stop - start)
+        dataset.read_direct(values, source_sel=block, dest_sel=dest)
+        for consumer in consumers:
+            consumer.update(values[dest])
+    record_read(dataset.dtype.itemsize * len(values))
+    return values
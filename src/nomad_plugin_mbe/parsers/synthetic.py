@@ -0,0 +1,213 @@
+"""
+Generator of synthetic MBE NeXus files with the layout `HDF5MBEParser` expects.
+
+The files describe a GaAs/AlAs stack grown on a GaAs substrate, with a
+configurable number of users, chamber sensors, layers and cells per layer. The
+sensors can carry recorded time series of any length, and the layer stack can be
+written as one `layerNN` group per layer or as parallel arrays in `sample/layers`.
+The files are used by the tests and the benchmarks.
+"""
+
+import h5py
+import numpy as np
+
+SENSOR_MEASUREMENTS = [
+    'pressure',
+    'emissivity_temperature',
+    'reflectivity',
+    'rate_temperature',
+]
+NOMINAL_SENSOR_VALUES = {
+    'pressure': 1e-9,
+    'emissivity_temperature': 580.0,
+    'reflectivity': 0.3,
+    'rate_temperature': 1.0,
+}
+
+
+def write_group(group, values):
+    """Writes a nested dictionary as groups and datasets."""
+    for key, value in values.items():
+        if isinstance(value, dict):
+            write_group(group.create_group(key), value)
+        else:
+            group[key] = value
+
+
+def mbe_entry(n_layers=2, n_cells=2, n_sensors=2, n_users=1):
+    """Returns the contents of an NXentry group as a nested dictionary."""
+    entry = {
+        'definition': 'NXmbe',
+        'title': 'HM1234 test growth',
+        'experiment_description': 'Molecular Beam Epitaxy',
+        'start_time': '2024-05-02T09:30:00',
+        'end_time': '2024-05-02T13:30:00',
+        'duration': 4.0,
+        'instrument': {
+            'chamber': {
+                'name': 'Riber 32',
+                'type': 'solid source',
+                'cooling_device': {
+                    'name': 'cryopanel',
+                    'cooling_mode': 'liquid_nitrogen',
+                    'temperature': 77.0,
+                },
+            },
+        },
+        'sample': {
+            'name': 'HM1234DBR',
+            'thickness': 1.5,
+            'substrate': {
+                'name': 'W-42',
+                'chemical_formula': 'GaAs',
+                'crystalline_structure': 'single crystal',
+                'diameter': 2,
+                'thickness': 350.0,
+            },
+        },
+    }
+    for index in range(1, n_users + 1):
+        entry[f'user_{index}'] = {'name': f'User {index}', 'role': 'operator'}
+    for index in range(1, n_sensors + 1):
+        measurement = SENSOR_MEASUREMENTS[(index - 1) % len(SENSOR_MEASUREMENTS)]
+        entry['instrument']['chamber'][f'sensor_{index}'] = {
+            'name': f'sensor {index}',
+            'measurement': measurement,
+            'value': NOMINAL_SENSOR_VALUES[measurement] * index,
+        }
+    for index in range(1, n_layers + 1):
+        entry['sample'][f'layer{index:02d}'] = mbe_layer(index, n_cells)
+    return entry
+
+
+def mbe_layer(index, n_cells):
+    """Returns the contents of the layerNN group of the index-th layer."""
+    layer = {
+        'name': f'layer {index}',
+        'chemical_formula': 'GaAs' if index % 2 else 'AlAs',
+        'thickness': 30.0,
+        'growth_temperature': 580.0,
+        'growth_time': 30.0,
+        'growth_rate': 1.0,
+    }
+    for cell_index in range(1, n_cells + 1):
+        layer[f'cell_{cell_index}'] = {
+            'name': f'cell {cell_index}',
+            'type': 'effusion_cell',
+            'shutter_status': 'open',
+            'partial_growth_rate': 1.0 / n_cells,
+        }
+    return layer
+
+
+def write_layer_columns(sample, n_layers, n_cells):
+    """Writes the layer stack as parallel arrays in `sample/layers`."""
+
+    def column(values):
+        return (
+            [value.encode() for value in values]
+            if isinstance(values[0], str)
+            else values
+        )
+
+    layers = sample.create_group('layers')
+    rows = [mbe_layer(index, n_cells) for index in range(1, n_layers + 1)]
+    if not rows:
+        return
+    for key, value in rows[0].items():
+        if not isinstance(value, dict):
+            layers[key] = column([row[key] for row in rows])
+    for cell_index in range(1, n_cells + 1):
+        cell = layers.create_group(f'cell_{cell_index}')
+        for key in rows[0][f'cell_{cell_index}']:
+            cell[key] = column([row[f'cell_{cell_index}'][key] for row in rows])
+
+
+def write_sensor_series(  # noqa: PLR0913
+    sensor,
+    measurement,
+    n_samples,
+    *,
+    rate=10.0,
+    chunk_size=65536,
+    compression=None,
+    seed=0,
+):
+    """
+    Writes a recorded trace of n_samples sampled at rate Hz as `value` and `time`
+    datasets: noise around the nominal value of the measurement with slow drift.
+    """
+    rng = np.random.default_rng(seed)
+    nominal = NOMINAL_SENSOR_VALUES[measurement]
+    chunks = (min(chunk_size, n_samples),)
+    time = sensor.create_dataset(
+        'time', shape=(n_samples,), dtype='f8', chunks=chunks, compression=compression
+    )
+    time.attrs['units'] = 's'
+    value = sensor.create_dataset(
+        'value', shape=(n_samples,), dtype='f8', chunks=chunks, compression=compression
+    )
+    for start in range(0, n_samples, chunks[0]):
+        stop = min(start + chunks[0], n_samples)
+        samples = np.arange(start, stop)
+        time[start:stop] = samples / rate
+        drift = 1 + 0.01 * np.sin(samples / (rate * 600))
+        value[start:stop] = (
+            nominal * drift * (1 + 0.001 * rng.standard_normal(stop - start))
+        )
+
+
+def write_mbe_nexus(  # noqa: PLR0913
+    path,
+    *,
+    n_layers=2,
+    n_cells=2,
+    n_sensors=2,
+    n_users=1,
+    n_samples=0,
+    columnar=False,
+    compression=None,
+    n_entries=1,
+):
+    """
+    Writes a synthetic MBE NeXus file. With n_samples, every sensor records a time
+    series of that length instead of a nominal value; with columnar, the layers are
+    written as parallel arrays. With several entries, one growth each is written to
+    the groups `entry1` to `entryN`, otherwise the growth is written to `entry`.
+    """
+    entry_values = mbe_entry(
+        n_layers=0 if columnar else n_layers,
+        n_cells=n_cells,
+        n_sensors=n_sensors,
+        n_users=n_users,
+    )
+    names = (
+        ['entry']
+        if n_entries == 1
+        else [f'entry{index}' for index in range(1, n_entries + 1)]
+    )
+    with h5py.File(path, 'w') as hdf:
+        for name in names:
+            entry = hdf.create_group(name)
+            entry.attrs['NX_class'] = 'NXentry'
+            title = (
+                entry_values['title']
+                if n_entries == 1
+                else f'{entry_values["title"]} {name}'
+            )
+            write_group(entry, dict(entry_values, title=title))
+            if columnar:
+                write_layer_columns(entry['sample'], n_layers, n_cells)
+            if n_samples:
+                for index in range(1, n_sensors + 1):
+                    sensor = entry[f'instrument/chamber/sensor_{index}']
+                    measurement = sensor['measurement'][()].decode()
+                    del sensor['value']
+                    write_sensor_series(
+                        sensor,
+                        measurement,
+                        n_samples,
+                        compression=compression,
+                        seed=index,
+                    )
+    return path
@@ -0,0 +1,129 @@
+import functools
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+_active_trace = ContextVar('active_trace', default=None)
+
+
+class ParseTrace:
+    """
+    Timings and HDF5 read statistics of one parse.
+
+    Time is accounted per section type as exclusive wall time: while a nested span,
+    e.g. a cell within a layer, is open, the time counts for the nested span only.
+    With `detailed`, the spans are also kept as a tree with one node per span.
+    """
+
+    def __init__(self, detailed=False):
+        self.detailed = detailed
+        self.section_seconds = defaultdict(float)
+        self.section_counts = defaultdict(int)
+        self.datasets_read = 0
+        self.bytes_read = 0
+        self.file_open_seconds = 0.0
+        self.cache_hit = False
+        self.in_memory = False
+        self.tree = {'name': 'parse', 'seconds': 0.0, 'children': []}
+        self._stack = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        node = None
+        if self.detailed:
+            node = {'name': name, 'seconds': 0.0, 'children': []}
+            parent = self._stack[-1][2] if self._stack else self.tree
+            parent['children'].append(node)
+        frame = [name, 0.0, node]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - start
+            self.section_seconds[name] += elapsed - frame[1]
+            self.section_counts[name] += 1
+            if self._stack:
+                self._stack[-1][1] += elapsed
+            if node is not None:
+                node['seconds'] = elapsed
+
+    def record_read(self, nbytes):
+        self.datasets_read += 1
+        self.bytes_read += nbytes
+
+    def summary(self):
+        """Returns the statistics of the parse as flat, structured log fields."""
+        self.tree['seconds'] = time.perf_counter() - self._start
+        summary = dict(
+            parse_seconds=self.tree['seconds'],
+            file_open_seconds=self.file_open_seconds,
+            datasets_read=self.datasets_read,
+            bytes_read=self.bytes_read,
+            cache_hit=self.cache_hit,
+            in_memory=self.in_memory,
+            section_seconds=dict(self.section_seconds),
+            section_counts=dict(self.section_counts),
+        )
+        if self.detailed:
+            summary['span_tree'] = self.tree
+        return summary
+
+
+def log_event(logger, event, **fields):
+    """
+    Logs an info event with structured fields: as keyword arguments for structlog
+    loggers, as record attributes for standard library loggers, which reject them.
+    """
+    if isinstance(logger, logging.Logger):
+        logger.info(event, extra=fields)
+    else:
+        logger.info(event, **fields)
+
+
+@contextmanager
+def tracing(trace):
+    """Makes the trace the active one for `span` and `record_read` within the block."""
+    token = _active_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _active_trace.reset(token)
+
+
+def span(name):
+    """Times a section of the active trace, if there is one."""
+    trace = _active_trace.get()
+    return trace.span(name) if trace is not None else nullcontext()
+
+
+def record_read(nbytes):
+    """Counts a dataset read for the active trace, if there is one."""
+    trace = _active_trace.get()
+    if trace is not None:
+        trace.record_read(nbytes)
+
+
+def traced(name):
+    """Decorator that times every call of the function as a span of the active trace."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def value_nbytes(value):
+    """Returns the size in bytes of a value read from an HDF5 dataset."""
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return getattr(value, 'nbytes', 8)
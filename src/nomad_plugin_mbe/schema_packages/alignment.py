@@ -0,0 +1,66 @@
+import numpy as np
+
+# Samples of the common time grid at most, the step is widened beyond that so the
+# aligned array of a long growth stays in memory.
+MAX_GRID_SAMPLES = 1 << 20
+
+
+def sorted_series(time, signal):
+    """Returns the samples of a series with a known time, in time order, as floats."""
+    n = min(len(time), len(signal))
+    time = np.asarray(time[:n], dtype=np.float64)
+    signal = np.asarray(signal[:n], dtype=np.float64)
+    known = np.isfinite(time)
+    if not known.all():
+        time, signal = time[known], signal[known]
+    if len(time) and np.any(time[1:] < time[:-1]):
+        order = np.argsort(time, kind='stable')
+        time, signal = time[order], signal[order]
+    return time, signal
+
+
+def common_timebase(time_axes, step=None, max_samples=MAX_GRID_SAMPLES):
+    """
+    Returns an evenly spaced time grid spanning all the sorted time axes. The step
+    is the given one, or the finest median sampling interval of the axes, so the
+    fastest sensor keeps its resolution, widened where the grid would exceed
+    `max_samples`.
+    """
+    axes = [axis for axis in time_axes if len(axis)]
+    if not axes:
+        return np.empty(0)
+    first = min(axis[0] for axis in axes)
+    last = max(axis[-1] for axis in axes)
+    span = last - first
+    if step is None:
+        intervals = [np.median(np.diff(axis)) for axis in axes if len(axis) > 1]
+        intervals = [interval for interval in intervals if interval > 0]
+        step = min(intervals) if intervals else span
+    if span <= 0 or not step > 0:
+        return np.array([first])
+    n = min(int(np.floor(span / step + 1e-9)) + 1, max_samples)
+    step = max(step, span / (max_samples - 1)) if n == max_samples else step
+    return first + step * np.arange(n)
+
+
+def align_series(time_axes, signals, step=None, max_samples=MAX_GRID_SAMPLES):
+    """
+    Resamples time series onto one common time grid by linear interpolation, one
+    vectorized interpolation per series.
+
+    Returns a 2-D array with the grid in the first column and every series in the
+    following ones. Grid points outside the recorded span of a series, or next to
+    a NaN sample, are NaN, so gaps are not bridged.
+    """
+    series = [sorted_series(time, signal) for time, signal in zip(time_axes, signals)]
+    grid = common_timebase([time for time, _ in series], step, max_samples)
+    aligned = np.empty((len(grid), len(series) + 1))
+    aligned[:, 0] = grid
+    for column, (time, signal) in enumerate(series, start=1):
+        if len(time):
+            aligned[:, column] = np.interp(
+                grid, time, signal, left=np.nan, right=np.nan
+            )
+        else:
+            aligned[:, column] = np.nan
+    return aligned
@@ -0,0 +1,57 @@
+import numpy as np
+
+# Layers whose rate deviates from the fit by more than this fraction are flagged.
+RESIDUAL_TOLERANCE = 0.1
+
+
+def cell_matrix(rows, names, values, n_layers):
+    """
+    Arranges per-cell records, given as parallel arrays of layer index, cell name and
+    value, as a layer x cell matrix. Returns the sorted cell names and the matrix,
+    with zeros where a layer has no record of a cell.
+    """
+    cell_names, columns = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+    matrix = np.zeros((n_layers, len(cell_names)))
+    matrix[np.asarray(rows, dtype=np.int64), columns] = values
+    return cell_names, matrix
+
+
+def layer_rates(growth_rate, thickness, growth_time):
+    """
+    Returns the total growth rate of every layer: the recorded growth rate, or the
+    thickness over the growth time where no rate is recorded.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived = thickness / growth_time
+    derived[~np.isfinite(derived)] = np.nan
+    return np.where(np.isnan(growth_rate), derived, growth_rate)
+
+
+def fit_cell_rates(open_matrix, rates):
+    """
+    Solves rates ~ open_matrix @ cell_rates for the effective rate of every cell
+    with one least-squares fit over all layers that have a rate and an open cell.
+
+    Returns the cell rates, NaN for cells that are never open, the residual of
+    every layer, NaN for layers not in the fit, and the rank of the fitted matrix.
+    With a rank below the number of fitted cells, cells that are only ever open
+    together cannot be told apart and share their rate evenly.
+    """
+    open_matrix = np.asarray(open_matrix, dtype=np.float64)
+    fitted = np.isfinite(rates) & open_matrix.any(axis=1)
+    cell_rates = np.full(open_matrix.shape[1], np.nan)
+    residuals = np.full(len(rates), np.nan)
+    if not fitted.any():
+        return cell_rates, residuals, 0
+    design = open_matrix[fitted]
+    solution, _, rank, _ = np.linalg.lstsq(design, rates[fitted], rcond=None)
+    used = design.any(axis=0)
+    cell_rates[used] = solution[used]
+    residuals[fitted] = rates[fitted] - design @ solution
+    return cell_rates, residuals, int(rank)
+
+
+def inconsistent_layers(residuals, rates, tolerance=RESIDUAL_TOLERANCE):
+    """Returns the layers whose residual exceeds the tolerance relative to the rate."""
+    with np.errstate(invalid='ignore'):
+        return np.flatnonzero(np.abs(residuals) > tolerance * np.abs(rates))
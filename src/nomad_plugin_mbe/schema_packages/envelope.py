@@ -0,0 +1,51 @@
+import numpy as np
+
+# Samples per bin of the finest envelope level, the raw series serves below that.
+FINEST_BIN_SIZE = 64
+# The coarsest level has at most this many bins, enough for a full-width plot.
+COARSE_BINS = 1024
+
+
+def envelope_pyramid(
+    time, signal, finest_bin_size=FINEST_BIN_SIZE, coarse_bins=COARSE_BINS
+):
+    """
+    Decimates a time series into min/max envelopes at power-of-two bin sizes, from
+    `finest_bin_size` samples per bin up to the first level with at most
+    `coarse_bins` bins. Each level is reduced from the one below it, so the whole
+    pyramid costs one pass over the samples. NaN samples are ignored.
+
+    Returns (bin_size, time, minimum, maximum) per level, coarsest first, with the
+    time of the first sample of every bin. Series short enough to plot as they are
+    get a single level of one sample per bin, so they can be plotted the same way.
+    """
+    n = min(len(time), len(signal))
+    if n == 0:
+        return []
+    time = np.asarray(time[:n], dtype=np.float64)
+    signal = np.asarray(signal[:n], dtype=np.float64)
+    if n <= coarse_bins:
+        return [(1, time, signal, signal)]
+
+    bin_size = finest_bin_size
+    while bin_size > 1 and n <= coarse_bins * (bin_size // 2):
+        bin_size //= 2
+    starts = np.arange(0, n, bin_size)
+    level = (
+        bin_size,
+        time[starts],
+        np.fmin.reduceat(signal, starts),
+        np.fmax.reduceat(signal, starts),
+    )
+    levels = [level]
+    while len(level[1]) > coarse_bins:
+        size, level_time, minimum, maximum = level
+        pairs = np.arange(0, len(level_time), 2)
+        level = (
+            size * 2,
+            level_time[pairs],
+            np.fmin.reduceat(minimum, pairs),
+            np.fmax.reduceat(maximum, pairs),
+        )
+        levels.append(level)
+    return levels[::-1]
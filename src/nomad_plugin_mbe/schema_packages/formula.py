@@ -0,0 +1,93 @@
+import math
+import re
+from functools import lru_cache
+
+from ase.data import chemical_symbols
+
+ELEMENT_RE = re.compile(r'([A-Z][a-z]?)(\d+(?:\.\d*)?|\.\d+)?')
+KNOWN_ELEMENTS = frozenset(chemical_symbols[1:])
+# Elements of a ternary alloy, e.g. AlGaAs, two of which share a site.
+TERNARY_ELEMENTS = 3
+# Sublattice of the elements of III-V and II-VI compound semiconductors. The mixed
+# site of a ternary alloy is the one taken by two elements, e.g. the group V site
+# of GaAsSb.
+SITES = {
+    **dict.fromkeys(('B', 'Al', 'Ga', 'In', 'Tl'), 'III'),
+    **dict.fromkeys(('N', 'P', 'As', 'Sb', 'Bi'), 'V'),
+    **dict.fromkeys(('Be', 'Mg', 'Zn', 'Cd', 'Hg'), 'II'),
+    **dict.fromkeys(('O', 'S', 'Se', 'Te'), 'VI'),
+}
+
+
+@lru_cache(maxsize=4096)
+def parse_formula(formula, alloy_fraction=None):
+    """
+    Parses the chemical formula of a layer or substrate, e.g. `GaAs`,
+    `Al0.3Ga0.7As` or the ternary alloy `AlGaAs` with an alloy fraction.
+
+    Returns the sorted element symbols and the composition as (element, amount)
+    pairs in the order of the formula. Without explicit amounts, every element
+    counts once, except for alloys: in a ternary alloy with an alloy fraction x,
+    the two elements of the same group share their site as x and 1 - x, in the
+    order of the formula. The composition is unknown and None for ternary alloys
+    without an alloy fraction or without one mixed site, and for alloys of more
+    elements. Raises ValueError for formulas that cannot be parsed.
+
+    The results are memoized, since a stack repeats the same few formulas.
+    """
+    formula = formula.strip()
+    tokens = []
+    position = 0
+    for match in ELEMENT_RE.finditer(formula):
+        if match.start() != position or match.group(1) not in KNOWN_ELEMENTS:
+            break
+        tokens.append((match.group(1), match.group(2)))
+        position = match.end()
+    if not tokens or position != len(formula):
+        raise ValueError(f'Cannot parse the chemical formula {formula!r}')
+
+    amounts = {}
+    for element, written in tokens:
+        amount = float(written) if written else 1.0
+        amounts[element] = amounts.get(element, 0.0) + amount
+    elements = tuple(sorted(amounts))
+    if alloy_fraction is not None and math.isnan(alloy_fraction):
+        alloy_fraction = None
+
+    if len(amounts) < TERNARY_ELEMENTS or any(amount for _, amount in tokens):
+        return elements, tuple(amounts.items())
+    if len(amounts) > TERNARY_ELEMENTS or alloy_fraction is None:
+        return elements, None
+    mixed = mixed_site(tuple(amounts))
+    if mixed is None:
+        return elements, None
+    first, second = mixed
+    amounts[first] = alloy_fraction
+    amounts[second] = 1.0 - alloy_fraction
+    return elements, tuple(amounts.items())
+
+
+def mixed_site(elements):
+    """
+    Returns the two elements of a ternary alloy that share a site, in formula order,
+    or None if the elements do not take exactly two sites.
+    """
+    sites = [SITES.get(element) for element in elements]
+    if None in sites or len(set(sites)) != len(elements) - 1:
+        return None
+    shared = next(site for site in sites if sites.count(site) > 1)
+    return tuple(element for element, site in zip(elements, sites) if site == shared)
+
+
+def reduced_formula(formula, alloy_fraction=None):
+    """
+    Returns the formula with explicit amounts, e.g. `Al0.3Ga0.7As` for `AlGaAs`
+    with an alloy fraction of 0.3, or None if the composition is unknown.
+    """
+    _, composition = parse_formula(formula, alloy_fraction)
+    if composition is None:
+        return None
+    return ''.join(
+        element if amount == 1 else f'{element}{round(amount, 6):g}'
+        for element, amount in composition
+    )
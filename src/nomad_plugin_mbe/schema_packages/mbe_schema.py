@@ -24,13 +24,107 @@ from nomad.datamodel.data import (
     )
 
 import re
+import json
+import numpy as np
 from nomad.units import ureg
 from nomad.datamodel.metainfo.annotations import ELNAnnotation, ELNComponentEnum
 from nomad.metainfo import Section, SubSection, Package, Quantity, Datetime, MEnum
+from nomad.datamodel.results import Material, Results
+from nomad_plugin_mbe.schema_packages.alignment import align_series
+from nomad_plugin_mbe.schema_packages.calibration import (
+    RESIDUAL_TOLERANCE,
+    cell_matrix,
+    fit_cell_rates,
+    inconsistent_layers,
+    layer_rates,
+)
+from nomad_plugin_mbe.schema_packages.envelope import envelope_pyramid
+from nomad_plugin_mbe.schema_packages.formula import parse_formula, reduced_formula
+from nomad_plugin_mbe.schema_packages.repeats import MAX_PERIOD, find_repeats
+from nomad_plugin_mbe.schema_packages.windows import (
+    layer_boundaries,
+    window_indices,
+    window_statistics,
+)
 
 m_package = Package(name='mbe_sample_growth')
 
 
+def normalized_in_bulk(section, archive: 'EntryArchive') -> bool:
+    """
+    Whether the section is part of the MBESynthesis entry of the archive. The layers
+    and sensors of such an entry are normalized all at once by MBESynthesis.normalize,
+    instead of one normalize call per section.
+    """
+    return isinstance(archive.data, MBESynthesis) and section.m_root() is archive
+
+
+def modification_cache(section) -> dict:
+    """
+    Returns a dict for values derived from a section. It is emptied whenever the
+    section or any of its subsections change, which all bump the modification count.
+    """
+    cache = getattr(section, '_array_cache', None)
+    if cache is None or cache[0] != section.m_mod_count:
+        cache = section._array_cache = (section.m_mod_count, {})
+    return cache[1]
+
+
+def formula_key(layer):
+    """
+    Returns the chemical formula and alloy fraction the reduced formula of a layer
+    follows from, None without formula.
+    """
+    if not layer.chemical_formula:
+        return None
+    alloy_fraction = layer.alloy_fraction
+    if alloy_fraction is not None and np.isnan(alloy_fraction):
+        alloy_fraction = None
+    return layer.chemical_formula, alloy_fraction
+
+
+def normalize_layers(layers) -> None:
+    """
+    Sets the reduced formula of the layers, deriving it once per distinct formula and
+    alloy fraction.
+    """
+    formulas = {}
+    for layer in layers:
+        key = formula_key(layer)
+        if key is None:
+            continue
+        if key not in formulas:
+            # unparsable formulas are reported once per entry by MBESynthesis
+            try:
+                formulas[key] = reduced_formula(*key)
+            except ValueError:
+                formulas[key] = ValueError
+        if formulas[key] is not ValueError:
+            layer.reduced_formula = formulas[key]
+
+
+def normalize_sensors(sensors, logger: 'BoundLogger') -> None:
+    """
+    Assigns the unit of every sensor value from its measurement type, warning once
+    per unknown type, and builds the plot envelopes of the recorded signals.
+    """
+    unknown = {}
+    for sensor in sensors:
+        sensor.build_envelope()
+        if not sensor.measurement:
+            continue
+        unit = SENSOR_UNITS.get(sensor.measurement.lower())
+        if unit:
+            sensor.value_unit = unit
+        else:
+            unknown[sensor.measurement] = unknown.get(sensor.measurement, 0) + 1
+    for measurement, count in unknown.items():
+        suffix = f" ({count} sensors)" if count > 1 else ""
+        logger.warning(
+            f"Unknown measurement type '{measurement}', no unit assigned{suffix}."
+        )
+
+
 class User(ArchiveSection):
 
     m_def = Section(
@@ -348,9 +442,23 @@ class SubstrateDescription(ArchiveSection):
         )
     )
 
+    reduced_formula = Quantity(
+        type=str,
+        description=(
+            "Chemical formula of the substrate with explicit amounts, derived from the "
+            "chemical formula"
+        ),
+    )
+
     def normalize(self, archive: 'EntryArchive', logger: 'BoundLogger') -> None:
         super().normalize(archive, logger)
 
+        if self.chemical_formula:
+            try:
+                self.reduced_formula = reduced_formula(self.chemical_formula)
+            except ValueError:
+                pass
+
 # ----------------------------------
 
 class LayerDescription(ArchiveSection):
@@ -457,13 +565,153 @@ class LayerDescription(ArchiveSection):
         )
     )
 
+    reduced_formula = Quantity(
+        type=str,
+        description=(
+            "Chemical formula of the layer with explicit amounts, e.g. Al0.3Ga0.7As "
+            "for AlGaAs with an alloy fraction of 0.3"
+        ),
+    )
+
     cell = SubSection(section_def=MaterialSource, repeats=True)
 
     def normalize(self, archive: 'EntryArchive', logger: 'BoundLogger') -> None:
         super().normalize(archive, logger)
 
+        if not normalized_in_bulk(self, archive):
+            normalize_layers([self])
+
 # ----------------------------------
 
+class SignalEnvelope(ArchiveSection):
+    """
+    Minimum and maximum of a recorded signal in bins of `bin_size` consecutive
+    samples, a decimated level of the trace for plotting.
+    """
+
+    m_def = Section(
+        a_plot={
+            'label': 'Signal envelope',
+            'x': 'time',
+            'y': ['./value_min', './value_max'],
+        }
+    )
+
+    bin_size = Quantity(
+        type=int,
+        description="Number of samples per bin",
+    )
+
+    time = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='s',
+        description="Time of the first sample of every bin",
+    )
+
+    value_min = Quantity(
+        type=np.float64,
+        shape=['*'],
+        description="Minimum of the signal in every bin",
+    )
+
+    value_max = Quantity(
+        type=np.float64,
+        shape=['*'],
+        description="Maximum of the signal in every bin",
+    )
+
+
+class SensorAnomaly(ArchiveSection):
+    """
+    Anomaly detected in a recorded signal while it was parsed: an outlier, e.g. a
+    pressure burst or a temperature overshoot, or a change point, e.g. a
+    reflectivity dropout.
+    """
+
+    kind = Quantity(
+        type=MEnum([
+            'outlier',
+            'change_point',
+        ]),
+        description=(
+            "Single samples far off the rolling mean, or a shift of the mean level"
+        ),
+    )
+
+    direction = Quantity(
+        type=MEnum([
+            'rise',
+            'drop',
+        ]),
+        description="Whether the signal rises above or drops below the rolling mean",
+    )
+
+    start_time = Quantity(
+        type=float,
+        unit='s',
+        description=(
+            "Time of the first anomalous sample, relative to the start of the growth"
+        ),
+    )
+
+    end_time = Quantity(
+        type=float,
+        unit='s',
+        description=(
+            "Time of the last anomalous sample, relative to the start of the growth"
+        ),
+    )
+
+    peak_time = Quantity(
+        type=float,
+        unit='s',
+        description=(
+            "Time of the most anomalous sample, relative to the start of the growth"
+        ),
+    )
+
+    start_index = Quantity(
+        type=int,
+        description="Index of the first anomalous sample in the signal",
+    )
+
+    end_index = Quantity(
+        type=int,
+        description="Index of the last anomalous sample in the signal",
+    )
+
+    peak_value = Quantity(
+        type=float,
+        description="Signal at the most anomalous sample",
+    )
+
+    score = Quantity(
+        type=float,
+        description=(
+            "Deviation at the most anomalous sample, in rolling standard deviations of "
+            "the signal"
+        ),
+    )
+
+    layer_index = Quantity(
+        type=int,
+        description=(
+            "Index in the full layer stack of the layer grown at the most anomalous "
+            "sample"
+        ),
+    )
+
+
+# Unit of the sensor value per (lower case) measurement type
+SENSOR_UNITS = {
+    'emissivity_temperature': 'celsius',
+    'pressure': 'mbar',
+    'rate_temperature': 'unitless',
+    'reflectivity': 'unitless',
+}
+
+
 class SensorDescription(ArchiveSection):
 
     m_def = Section(
@@ -477,7 +725,13 @@ class SensorDescription(ArchiveSection):
                     'value_unit'
                 ]
             }
-        )
+        ),
+        # the coarsest envelope level, the full signal is only loaded on demand
+        a_plot={
+            'label': 'Signal',
+            'x': 'envelope/0/time',
+            'y': ['envelope/0/value_min', 'envelope/0/value_max'],
+        },
     )
 
     name = Quantity(
@@ -520,26 +774,69 @@ class SensorDescription(ArchiveSection):
         )
     )
 
+    value_min = Quantity(
+        type=float,
+        description="Minimum of the recorded signal",
+    )
+
+    value_max = Quantity(
+        type=float,
+        description="Maximum of the recorded signal",
+    )
+
+    value_std = Quantity(
+        type=float,
+        description="Standard deviation of the recorded signal",
+    )
+
+    sample_count = Quantity(
+        type=int,
+        description="Number of samples in the recorded signal",
+    )
+
+    time = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='s',
+        description=(
+            "Time axis of the recorded signal, relative to the start of the growth"
+        ),
+    )
+
+    signal = Quantity(
+        type=np.float64,
+        shape=['*'],
+        description="Signal recorded by the sensor over time",
+    )
+
+    n_dropped_anomalies = Quantity(
+        type=int,
+        description="Number of further anomalies detected beyond those stored",
+    )
+
+    envelope = SubSection(section_def=SignalEnvelope, repeats=True)
+    anomaly = SubSection(section_def=SensorAnomaly, repeats=True)
+
+    def build_envelope(self) -> None:
+        """
+        Sets the min/max envelope pyramid of the recorded signal, coarsest level first.
+        """
+        if self.time is None or self.signal is None:
+            self.envelope = []
+            return
+        levels = envelope_pyramid(self.time.to('s').magnitude, self.signal)
+        self.envelope = [
+            SignalEnvelope(
+                bin_size=bin_size, time=time, value_min=minimum, value_max=maximum
+            )
+            for bin_size, time, minimum, maximum in levels
+        ]
+
     def normalize(self, archive: 'EntryArchive', logger: 'BoundLogger') -> None:
         super().normalize(archive, logger)
 
-        if self.measurement:
-            m = self.measurement.lower()
-            unit = None
-
-            if m == 'emissivity_temperature':
-                unit = 'celsius'
-            elif m == 'pressure':
-                unit = 'mbar'
-            elif m == 'rate_temperature':
-                unit = 'unitless'
-            elif m == 'reflectivity':
-                unit = 'unitless'
-
-            if unit:
-                self.value_unit = unit
-            else:
-                logger.warning(f"Unknown measurement type '{self.measurement}', no unit assigned.")
+        if not normalized_in_bulk(self, archive):
+            normalize_sensors([self], logger)
 
 # ----------------------------------
 
@@ -593,6 +890,37 @@ class SampleGrowingEnvironment(ArchiveSection):
     cooling_device = SubSection(section_def=CoolingDevice)
     sensor = SubSection(section_def=SensorDescription, repeats=True)
 
+    def aligned_sensors(self, step=None):
+        """
+        Returns the recorded sensor traces resampled onto one common time grid, as
+        the column names, 'time' followed by the sensor names, and a read-only
+        2-D array with the grid in seconds in the first column and one column per
+        sensor. The time axes of the traces are all relative to the start of the
+        growth. The grid step is `step` seconds, by default the sampling interval
+        of the fastest sensor.
+
+        The alignment is computed on first use and cached until a sensor changes.
+        """
+        cache = modification_cache(self)
+        if ('aligned', step) not in cache:
+            sensors = [
+                sensor
+                for sensor in self.sensor
+                if sensor.time is not None and sensor.signal is not None
+            ]
+            names = ['time'] + [
+                sensor.name or sensor.measurement or f'sensor_{index}'
+                for index, sensor in enumerate(sensors)
+            ]
+            aligned = align_series(
+                [sensor.time.to('s').magnitude for sensor in sensors],
+                [sensor.signal for sensor in sensors],
+                step=step,
+            )
+            aligned.flags.writeable = False
+            cache['aligned', step] = (names, aligned)
+        return cache['aligned', step]
+
     def normalize(self, archive: 'EntryArchive', logger: 'BoundLogger') -> None:
         super().normalize(archive, logger)
 
@@ -615,6 +943,251 @@ class Instruments(ArchiveSection):
 
 # ----------------------------------
 
+class LayerRepeatBlock(ArchiveSection):
+    """
+    Superlattice in the layer stack: the layers of one period, grown `repetitions`
+    times in a row from the layer at `start_index` of the full stack on.
+    """
+
+    start_index = Quantity(
+        type=int,
+        description="Index of the first layer of the block in the full layer stack",
+    )
+
+    repetitions = Quantity(
+        type=int,
+        description="Number of times the period is grown",
+    )
+
+    period_thickness = Quantity(
+        type=float,
+        unit='angstrom',
+        description="Thickness of one period",
+    )
+
+    period_sequence = Quantity(
+        type=str,
+        description="Chemical formulas of the layers of one period, e.g. GaAs/AlAs",
+    )
+
+    layer_name = Quantity(
+        type=str,
+        shape=['*'],
+        description=(
+            "Names of the layers of all repetitions of the block, in stack order"
+        ),
+    )
+
+    layer = SubSection(section_def=LayerDescription, repeats=True)
+
+    def expanded_layers(self, named=True):
+        """
+        Returns the layers of all repetitions: the layer sections of the period,
+        or where a repetition names a layer differently, a RepeatedLayer with the
+        name of the repetition. Without `named`, only the layer sections.
+        """
+        layers = list(self.layer) * (self.repetitions or 1)
+        if not named or self.layer_name is None:
+            return layers
+        return [
+            layer
+            if (name or None) == layer.name
+            else RepeatedLayer(layer, name or None)
+            for layer, name in zip(layers, self.layer_name)
+        ]
+
+
+class RepeatedLayer:
+    """
+    Layer of a later repetition of a repeat block: the period's layer section under its
+    own name.
+    """
+
+    __slots__ = ('_layer', 'name')
+
+    def __init__(self, layer, name):
+        self._layer = layer
+        self.name = name
+
+    def __getattr__(self, name):
+        return getattr(self._layer, name)
+
+
+# ----------------------------------
+
+class LayerSensorStatistics(ArchiveSection):
+    """
+    Statistics of the recorded signal of one sensor during the growth of every
+    layer, one array entry per layer of the full stack. Layers without samples,
+    or without known growth window, have a count of 0 and NaN statistics.
+    """
+
+    sensor_name = Quantity(
+        type=str,
+        description="Name of the sensor",
+    )
+
+    measurement = Quantity(
+        type=str,
+        description="Physical quantity measured by the sensor",
+    )
+
+    value_unit = Quantity(
+        type=str,
+        description="Unit of the sensor values",
+    )
+
+    window_start = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='s',
+        description=(
+            "Start of the growth of every layer, relative to the start of the growth"
+        ),
+    )
+
+    window_end = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='s',
+        description=(
+            "End of the growth of every layer, relative to the start of the growth"
+        ),
+    )
+
+    sample_count = Quantity(
+        type=np.int64,
+        shape=['*'],
+        description=(
+            "Number of valid, non-NaN samples recorded during the growth of every "
+            "layer"
+        ),
+    )
+
+    value_mean = Quantity(
+        type=np.float64,
+        shape=['*'],
+        description="Mean of the signal during the growth of every layer",
+    )
+
+    value_min = Quantity(
+        type=np.float64,
+        shape=['*'],
+        description="Minimum of the signal during the growth of every layer",
+    )
+
+    value_max = Quantity(
+        type=np.float64,
+        shape=['*'],
+        description="Maximum of the signal during the growth of every layer",
+    )
+
+    value_std = Quantity(
+        type=np.float64,
+        shape=['*'],
+        description="Standard deviation of the signal during the growth of every layer",
+    )
+
+
+# ----------------------------------
+
+class LayerCellArrays(ArchiveSection):
+    """
+    Settings of one material source for every layer of a compact layer stack, one
+    array entry per layer. Missing values are empty strings or NaN.
+    """
+
+    name = Quantity(
+        type=str,
+        shape=['*'],
+        description="Name of the material source for each layer",
+    )
+
+    model = Quantity(
+        type=str,
+        shape=['*'],
+        description="Model of the material source for each layer",
+    )
+
+    type = Quantity(
+        type=str,
+        shape=['*'],
+        description="Type of the material source for each layer",
+    )
+
+    shutter_status = Quantity(
+        type=str,
+        shape=['*'],
+        description="Status of the shutter during the deposition of each layer",
+    )
+
+    partial_growth_rate = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='angstrom/s',
+        description=(
+            "Partial growth rate of the cell during the deposition of each layer"
+        ),
+    )
+
+    partial_pressure = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='torr',
+        description="Partial pressure of the cell during the deposition of each layer",
+    )
+
+
+class ArrayView:
+    """
+    Read-only view of one entry of the array quantities of a section, with the
+    attribute access of the corresponding per-entry section `section_cls`:
+    `view.thickness` is `section.<prefix>thickness[index]`, empty strings and NaN
+    read as None, as do quantities of `section_cls` without an array.
+    """
+
+    __slots__ = ('_section', '_index', '_prefix', '_section_cls')
+
+    def __init__(self, section, index, section_cls, prefix=''):
+        self._section = section
+        self._index = index
+        self._section_cls = section_cls
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        quantity = self._section.m_def.all_quantities.get(self._prefix + name)
+        if quantity is None or not quantity.shape:
+            if name in self._section_cls.m_def.all_quantities:
+                return None
+            raise AttributeError(name)
+        values = getattr(self._section, quantity.name)
+        if values is None or self._index >= len(values):
+            return None
+        value = values[self._index]
+        magnitude = getattr(value, 'magnitude', value)
+        if magnitude == '' or (isinstance(magnitude, float) and np.isnan(magnitude)):
+            return None
+        return value
+
+
+class LayerView(ArrayView):
+    """Per-layer view of a compact layer stack, read like a LayerDescription."""
+
+    __slots__ = ()
+
+    def __init__(self, recipe, index):
+        super().__init__(recipe, index, LayerDescription, 'layer_')
+
+    @property
+    def cell(self):
+        return [
+            ArrayView(cells, self._index, MaterialSource)
+            for cells in self._section.layer_cell
+        ]
+
+
+# ----------------------------------
+
 class SampleRecipe(ArchiveSection):
 
     m_def = Section(
@@ -655,8 +1228,344 @@ class SampleRecipe(ArchiveSection):
         )
     )
 
+    layer_name = Quantity(
+        type=str,
+        shape=['*'],
+        description="Name of each layer of a compact layer stack",
+    )
+
+    layer_chemical_formula = Quantity(
+        type=str,
+        shape=['*'],
+        description="Chemical composition of each layer of a compact layer stack",
+    )
+
+    layer_doping = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='1 / cm ** 3',
+        description="Doping level of each layer of a compact layer stack",
+    )
+
+    layer_thickness = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='angstrom',
+        description="Thickness of each layer of a compact layer stack",
+    )
+
+    layer_growth_temperature = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='celsius',
+        description="Growing temperature of each layer of a compact layer stack",
+    )
+
+    layer_growth_time = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='s',
+        description="Growing time of each layer of a compact layer stack",
+    )
+
+    layer_growth_rate = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='angstrom/s',
+        description="Growing rate of each layer of a compact layer stack",
+    )
+
+    layer_alloy_fraction = Quantity(
+        type=np.float64,
+        shape=['*'],
+        description=(
+            "Fraction of the first element in a ternary alloy for each layer of a "
+            "compact layer stack"
+        ),
+    )
+
+    layer_rotational_frequency = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='rpm',
+        description=(
+            "Rotational frequency of the sample for each layer of a compact layer "
+            "stack"
+        ),
+    )
+
     substrate = SubSection(section_def=SubstrateDescription)
     layer = SubSection(section_def=LayerDescription, repeats=True)
+    layer_cell = SubSection(section_def=LayerCellArrays, repeats=True)
+    repeat_block = SubSection(section_def=LayerRepeatBlock, repeats=True)
+    layer_sensor = SubSection(section_def=LayerSensorStatistics, repeats=True)
+
+    @property
+    def n_compact_layers(self):
+        """Number of layers stored in the compact layer arrays."""
+        return max(
+            (
+                len(getattr(self, name))
+                for name in COMPACT_LAYER_QUANTITIES
+                if getattr(self, name) is not None
+            ),
+            default=0,
+        )
+
+    def layer_views(self):
+        """
+        Returns the layers of the stack, whichever way they are stored: the
+        LayerDescription sections, or one LayerView per layer of the compact layer
+        arrays (`layer_thickness`, ... and `layer_cell`), which reads like a
+        LayerDescription without creating a section per layer and cell.
+        """
+        if self.repeat_block:
+            return self.expanded_layers()
+        if self.layer:
+            return list(self.layer)
+        return [LayerView(self, index) for index in range(self.n_compact_layers)]
+
+    def compress_layer_repeats(self, max_period=MAX_PERIOD, min_repetitions=2):
+        """
+        Detects superlattices in the layer sections, runs of a period of up to
+        `max_period` layers repeated at least `min_repetitions` times, and replaces
+        every run by a LayerRepeatBlock with the layers of the first period. Layers
+        are compared by all their quantities and cells except their names, the
+        names of all repetitions are kept in the `layer_name` of the block. The
+        remaining layers stay in `layer`; `layer_views()` expands the blocks.
+        Returns the number of blocks.
+        """
+        layers = list(self.layer)
+        keys = []
+        for layer in layers:
+            data = layer.m_to_dict()
+            data.pop('name', None)
+            keys.append(json.dumps(data, sort_keys=True))
+        blocks = find_repeats(keys, max_period, min_repetitions)
+        if not blocks:
+            return 0
+
+        single_layers = []
+        period_layers_of_blocks = []
+        position = 0
+        for start, period, repetitions in blocks:
+            single_layers.extend(layers[position:start])
+            period_layers = layers[start:start + period]
+            block = LayerRepeatBlock(
+                start_index=start,
+                repetitions=repetitions,
+                period_sequence='/'.join(
+                    layer.chemical_formula or '' for layer in period_layers
+                ),
+            )
+            block_layers = layers[start:start + period * repetitions]
+            names = [layer.name or '' for layer in block_layers]
+            if any(names):
+                block.layer_name = names
+            thicknesses = [layer.thickness for layer in period_layers]
+            if all(thickness is not None for thickness in thicknesses):
+                block.period_thickness = sum(thicknesses[1:], thicknesses[0])
+            period_layers_of_blocks.append((block, period_layers))
+            position = start + period * repetitions
+        single_layers.extend(layers[position:])
+
+        self.layer = single_layers
+        for block, period_layers in period_layers_of_blocks:
+            block.layer = period_layers
+            self.repeat_block.append(block)
+        return len(blocks)
+
+    @property
+    def n_layers(self):
+        """Number of layers in the full stack, whichever way it is stored."""
+        if self.repeat_block:
+            return len(self.layer) + sum(
+                len(block.layer) * (block.repetitions or 1)
+                for block in self.repeat_block
+            )
+        return len(self.layer) or self.n_compact_layers
+
+    def array_cache(self):
+        """
+        Returns a dict for arrays derived from the stack. It is emptied whenever the
+        recipe or any of its layers change.
+        """
+        return modification_cache(self)
+
+    def layer_array(self, name):
+        """
+        Returns a layer quantity for the full stack as a read-only float array in
+        the unit of the LayerDescription quantity, with NaN for missing values.
+        """
+        cache = self.array_cache()
+        if ('layer', name) in cache:
+            return cache['layer', name]
+        if not self.layer and not self.repeat_block:
+            values = getattr(self, f'layer_{name}')
+            if values is None:
+                array = np.full(self.n_compact_layers, np.nan)
+            else:
+                array = np.array(getattr(values, 'magnitude', values), dtype=np.float64)
+        else:
+            # the layers of a repeat block are read once, however often they repeat
+            magnitudes = {}
+            for layer in self.distinct_layers():
+                value = getattr(layer, name)
+                magnitudes[id(layer)] = getattr(value, 'magnitude', value)
+            array = np.array(
+                [magnitudes[id(layer)] for layer in self.expanded_layers(named=False)],
+                dtype=np.float64,
+            )
+        array.flags.writeable = False
+        cache['layer', name] = array
+        return array
+
+    def formula_keys(self):
+        """
+        Returns the distinct pairs of chemical formula and alloy fraction of the stack.
+        """
+        if not self.layer and not self.repeat_block:
+            alloy_fractions = self.layer_array('alloy_fraction')
+            formulas = self.layer_chemical_formula or []
+            return {
+                (formula, None if np.isnan(alloy_fraction) else float(alloy_fraction))
+                for formula, alloy_fraction in zip(formulas, alloy_fractions)
+                if formula
+            }
+        return {formula_key(layer) for layer in self.distinct_layers()} - {None}
+
+    def cell_names(self):
+        """Returns the sorted names of all material sources of the stack."""
+        if not self.layer and not self.repeat_block:
+            names = {name for cells in self.layer_cell for name in (cells.name or [])}
+        else:
+            names = {
+                cell.name for layer in self.distinct_layers() for cell in layer.cell
+            }
+        return sorted(names - {None, ''})
+
+    def cell_records(self, name):
+        """
+        Returns a MaterialSource quantity for every named cell of the full stack as
+        three parallel read-only arrays: the layer index, the cell name and the
+        value, as float in the unit of the quantity or as str.
+        """
+        cache = self.array_cache()
+        if ('cell', name) not in cache:
+            records = self.read_cell_records(name)
+            for array in records:
+                array.flags.writeable = False
+            cache['cell', name] = records
+        return cache['cell', name]
+
+    def read_cell_records(self, name):
+        if not self.layer and not self.repeat_block:
+            rows, names, values = [], [], []
+            for cells in self.layer_cell:
+                if cells.name is None:
+                    continue
+                cell_names = np.asarray(cells.name, dtype=str)
+                cell_values = getattr(cells, name)
+                if cell_values is None:
+                    missing = np.nan if name != 'shutter_status' else ''
+                    cell_values = np.full(len(cell_names), missing)
+                cell_values = getattr(cell_values, 'magnitude', cell_values)
+                cell_values = np.asarray(cell_values)[:len(cell_names)]
+                named = np.flatnonzero(cell_names != '')
+                rows.append(named)
+                names.append(cell_names[named])
+                values.append(cell_values[named])
+            if not rows:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=str), np.zeros(0)
+            return np.concatenate(rows), np.concatenate(names), np.concatenate(values)
+
+        # the cells of the layers of a repeat block are read once
+        missing = np.nan if name != 'shutter_status' else None
+        records = {}
+        for layer in self.distinct_layers():
+            values = [(cell.name, getattr(cell, name)) for cell in layer.cell]
+            records[id(layer)] = [
+                (cell_name, getattr(value, 'magnitude', value))
+                for cell_name, value in values
+                if cell_name
+            ]
+        rows, names, values = [], [], []
+        for index, layer in enumerate(self.expanded_layers(named=False)):
+            for cell_name, value in records[id(layer)]:
+                rows.append(index)
+                names.append(cell_name)
+                values.append(missing if value is None else value)
+        return (
+            np.array(rows, dtype=np.int64),
+            np.array(names, dtype=str),
+            np.array(values),
+        )
+
+    def attach_sensor_statistics(self, sensors) -> None:
+        """
+        Sets the statistics of every recorded sensor trace per layer. The layers are
+        grown one after the other from the start of the growth, which is also the
+        origin of the sensor time axes, so the growth window of every layer follows
+        from the cumulative growth times. The windows are computed once and located
+        in every trace with a binary search.
+        """
+        boundaries = layer_boundaries(self.layer_array('growth_time'))
+        statistics = []
+        for sensor in sensors:
+            if sensor.time is None or sensor.signal is None:
+                continue
+            count, mean, minimum, maximum, std = window_statistics(
+                sensor.time.to('s').magnitude, sensor.signal, boundaries
+            )
+            statistics.append(LayerSensorStatistics(
+                sensor_name=sensor.name,
+                measurement=sensor.measurement,
+                value_unit=sensor.value_unit,
+                window_start=boundaries[:-1],
+                window_end=boundaries[1:],
+                sample_count=count,
+                value_mean=mean,
+                value_min=minimum,
+                value_max=maximum,
+                value_std=std,
+            ))
+        self.layer_sensor = statistics
+
+    def locate_anomalies(self, sensors) -> None:
+        """Sets the index of the layer grown at the peak of every sensor anomaly."""
+        boundaries = layer_boundaries(self.layer_array('growth_time'))
+        for sensor in sensors:
+            anomalies = [
+                anomaly for anomaly in sensor.anomaly if anomaly.peak_time is not None
+            ]
+            if not anomalies:
+                continue
+            times = [anomaly.peak_time.to('s').magnitude for anomaly in anomalies]
+            for anomaly, index in zip(anomalies, window_indices(boundaries, times)):
+                anomaly.layer_index = int(index) if index >= 0 else None
+
+    def distinct_layers(self):
+        """
+        Returns the layer sections of the stack, the layers of every repeat block once.
+        """
+        layers = list(self.layer)
+        for block in self.repeat_block:
+            layers.extend(block.layer)
+        return layers
+
+    def expanded_layers(self, named=True):
+        """
+        Returns the full layer stack, with the layers of the repeat blocks repeated,
+        see `LayerRepeatBlock.expanded_layers`.
+        """
+        layers = []
+        single_layers = iter(self.layer)
+        for block in sorted(self.repeat_block, key=lambda block: block.start_index):
+            while len(layers) < block.start_index:
+                layers.append(next(single_layers))
+            layers.extend(block.expanded_layers(named))
+        layers.extend(single_layers)
+        return layers
 
     def normalize(self, archive: 'EntryArchive', logger: 'BoundLogger') -> None:
         super().normalize(archive, logger)
@@ -669,6 +1578,290 @@ class SampleRecipe(ArchiveSection):
             else:
                 logger.warning(f"Could not extract type from name: {self.name}")
 
+COMPACT_LAYER_QUANTITIES = [
+    name for name in SampleRecipe.m_def.all_quantities if name.startswith('layer_')
+]
+
+# ----------------------------------
+
+class StackSummary(ArchiveSection):
+    """
+    Flat summary of the layer stack of an entry, one value per quantity, so that
+    searches and histograms do not have to aggregate over the nested layers.
+    """
+
+    n_layers = Quantity(
+        type=int,
+        description="Number of layers in the stack",
+    )
+
+    total_thickness = Quantity(
+        type=float,
+        unit='angstrom',
+        description="Sum of the thicknesses of all layers",
+    )
+
+    min_layer_thickness = Quantity(
+        type=float,
+        unit='angstrom',
+        description="Thickness of the thinnest layer",
+    )
+
+    max_layer_thickness = Quantity(
+        type=float,
+        unit='angstrom',
+        description="Thickness of the thickest layer",
+    )
+
+    min_growth_temperature = Quantity(
+        type=float,
+        unit='celsius',
+        description="Lowest growth temperature of the layers",
+    )
+
+    max_growth_temperature = Quantity(
+        type=float,
+        unit='celsius',
+        description="Highest growth temperature of the layers",
+    )
+
+    total_growth_time = Quantity(
+        type=float,
+        unit='s',
+        description="Sum of the growth times of all layers",
+    )
+
+    min_growth_rate = Quantity(
+        type=float,
+        unit='angstrom/s',
+        description="Lowest growth rate of the layers",
+    )
+
+    max_growth_rate = Quantity(
+        type=float,
+        unit='angstrom/s',
+        description="Highest growth rate of the layers",
+    )
+
+    min_doping = Quantity(
+        type=float,
+        unit='1 / cm ** 3',
+        description="Lowest doping level of the layers",
+    )
+
+    max_doping = Quantity(
+        type=float,
+        unit='1 / cm ** 3',
+        description="Highest doping level of the layers",
+    )
+
+    min_alloy_fraction = Quantity(
+        type=float,
+        description="Lowest alloy fraction of the layers",
+    )
+
+    max_alloy_fraction = Quantity(
+        type=float,
+        description="Highest alloy fraction of the layers",
+    )
+
+    min_rotational_frequency = Quantity(
+        type=float,
+        unit='rpm',
+        description="Lowest rotational frequency of the sample during the layers",
+    )
+
+    max_rotational_frequency = Quantity(
+        type=float,
+        unit='rpm',
+        description="Highest rotational frequency of the sample during the layers",
+    )
+
+    cell_names = Quantity(
+        type=str,
+        shape=['*'],
+        description="Names of all material sources used in the stack",
+    )
+
+    reduced_formulas = Quantity(
+        type=str,
+        shape=['*'],
+        description="Distinct reduced formulas of the layers, e.g. Al0.3Ga0.7As",
+    )
+
+    def summarize(self, recipe: 'SampleRecipe') -> None:
+        """
+        Sets the summary from the layer stack of the recipe, one array operation per
+        quantity.
+        """
+        self.n_layers = recipe.n_layers
+        if not self.n_layers:
+            return
+        for name, summary_name in (
+            ('thickness', 'layer_thickness'),
+            ('growth_temperature', 'growth_temperature'),
+            ('growth_time', None),
+            ('growth_rate', 'growth_rate'),
+            ('doping', 'doping'),
+            ('alloy_fraction', 'alloy_fraction'),
+            ('rotational_frequency', 'rotational_frequency'),
+        ):
+            values = recipe.layer_array(name)
+            if np.isnan(values).all():
+                continue
+            if name in ('thickness', 'growth_time'):
+                setattr(self, f'total_{name}', float(np.nansum(values)))
+            if summary_name is not None:
+                setattr(self, f'min_{summary_name}', float(np.nanmin(values)))
+                setattr(self, f'max_{summary_name}', float(np.nanmax(values)))
+        self.cell_names = recipe.cell_names()
+        formulas = set()
+        for key in recipe.formula_keys():
+            try:
+                formulas.add(reduced_formula(*key))
+            except ValueError:
+                continue
+        self.reduced_formulas = sorted(formulas)
+
+
+# ----------------------------------
+
+class GrowthRateCalibration(ArchiveSection):
+    """
+    Effective growth rate of every cell, fitted by least squares to the total
+    growth rates of all layers of the stack given which shutters were open.
+    """
+
+    cell_name = Quantity(
+        type=str,
+        shape=['*'],
+        description="Names of the cells, in the order of the rate arrays",
+    )
+
+    fitted_rate = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='angstrom/s',
+        description=(
+            "Fitted effective growth rate of every cell, NaN for cells that are never "
+            "open"
+        ),
+    )
+
+    nominal_rate = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='angstrom/s',
+        description=(
+            "Mean recorded partial growth rate of every cell over the layers it is "
+            "open in"
+        ),
+    )
+
+    rank = Quantity(
+        type=int,
+        description=(
+            "Rank of the layer x cell shutter matrix, below the number of cells if "
+            "cells are only ever open together"
+        ),
+    )
+
+    n_fitted_layers = Quantity(
+        type=int,
+        description=(
+            "Number of layers with a growth rate and an open cell, used in the fit"
+        ),
+    )
+
+    residual = Quantity(
+        type=np.float64,
+        shape=['*'],
+        unit='angstrom/s',
+        description=(
+            "Growth rate of every layer minus the sum of the fitted rates of its open "
+            "cells, NaN for layers not in the fit"
+        ),
+    )
+
+    rms_residual = Quantity(
+        type=float,
+        unit='angstrom/s',
+        description="Root mean square of the residuals of the fitted layers",
+    )
+
+    tolerance = Quantity(
+        type=float,
+        description=(
+            "Residual, relative to the growth rate of the layer, above which a layer "
+            "is inconsistent"
+        ),
+    )
+
+    inconsistent_layer_index = Quantity(
+        type=np.int64,
+        shape=['*'],
+        description=(
+            "Indices in the full stack of the layers whose residual exceeds the "
+            "tolerance"
+        ),
+    )
+
+    def calibrate(
+        self,
+        recipe: 'SampleRecipe',
+        logger: 'BoundLogger',
+        tolerance=RESIDUAL_TOLERANCE,
+    ) -> bool:
+        """
+        Fits the cell rates to the layer stack of the recipe. Returns False, leaving
+        the section empty, if no layer has both a growth rate and an open cell.
+        """
+        n_layers = recipe.n_layers
+        rows, names, status = recipe.cell_records('shutter_status')
+        if not n_layers or not len(rows):
+            return False
+        cell_names, open_matrix = cell_matrix(rows, names, status == 'open', n_layers)
+        rates = layer_rates(
+            recipe.layer_array('growth_rate'),
+            recipe.layer_array('thickness'),
+            recipe.layer_array('growth_time'),
+        )
+        cell_rates, residuals, rank = fit_cell_rates(open_matrix, rates)
+        fitted = ~np.isnan(residuals)
+        if not fitted.any():
+            return False
+
+        rows, names, partial_rates = recipe.cell_records('partial_growth_rate')
+        partial_rates = np.nan_to_num(partial_rates)
+        _, partial_matrix = cell_matrix(rows, names, partial_rates, n_layers)
+        with np.errstate(invalid='ignore'):
+            nominal = (partial_matrix * open_matrix).sum(axis=0)
+            nominal /= open_matrix.sum(axis=0)
+
+        self.cell_name = list(cell_names)
+        self.fitted_rate = cell_rates
+        self.nominal_rate = nominal
+        self.rank = rank
+        self.n_fitted_layers = int(fitted.sum())
+        self.residual = residuals
+        self.rms_residual = float(np.sqrt(np.mean(residuals[fitted] ** 2)))
+        self.tolerance = tolerance
+        self.inconsistent_layer_index = inconsistent_layers(residuals, rates, tolerance)
+
+        if rank < int(open_matrix[fitted].any(axis=0).sum()):
+            logger.warning(
+                "The rates of cells that are only open together cannot be separated, "
+                "they are split evenly."
+            )
+        inconsistent = self.inconsistent_layer_index
+        if len(inconsistent):
+            logger.warning(
+                f"{len(inconsistent)} layers deviate by more than {tolerance:.0%} "
+                f"from the fitted cell rates, e.g. layer {inconsistent[0]}."
+            )
+        return True
+
+
 # ----------------------------------
 
 class MBESynthesis(EntryData):
@@ -741,9 +1934,54 @@ class MBESynthesis(EntryData):
     user = SubSection(section_def=User, repeats=True)
     instrument = SubSection(section_def=Instruments)
     sample = SubSection(section_def=SampleRecipe)
+    stack_summary = SubSection(section_def=StackSummary)
+    growth_rate_calibration = SubSection(section_def=GrowthRateCalibration)
 
     def normalize(self, archive: 'EntryArchive', logger: 'BoundLogger') -> None:
         super().normalize(archive, logger)
 
+        # The layers and sensors skip their own normalize, see normalized_in_bulk
+        if self.sample is not None:
+            normalize_layers(self.sample.distinct_layers())
+        if self.instrument is not None and self.instrument.chamber is not None:
+            normalize_sensors(self.instrument.chamber.sensor, logger)
+
+        if self.sample is not None:
+            self.stack_summary = StackSummary()
+            self.stack_summary.summarize(self.sample)
+            calibration = GrowthRateCalibration()
+            if calibration.calibrate(self.sample, logger):
+                self.growth_rate_calibration = calibration
+            if self.instrument is not None and self.instrument.chamber is not None:
+                self.sample.attach_sensor_statistics(self.instrument.chamber.sensor)
+                self.sample.locate_anomalies(self.instrument.chamber.sensor)
+
+        elements = self.elements(logger)
+        if elements:
+            if archive.results is None:
+                archive.results = Results()
+            if archive.results.material is None:
+                archive.results.material = Material()
+            elements |= set(archive.results.material.elements or [])
+            archive.results.material.elements = sorted(elements)
+
+    def elements(self, logger: 'BoundLogger') -> set:
+        """
+        Returns the elements of the substrate and all layers, parsing every distinct
+        formula once.
+        """
+        if self.sample is None:
+            return set()
+        formulas = {formula for formula, _ in self.sample.formula_keys()}
+        if self.sample.substrate is not None:
+            formulas.add(self.sample.substrate.chemical_formula)
+        elements = set()
+        for formula in formulas - {None}:
+            try:
+                elements.update(parse_formula(formula)[0])
+            except ValueError:
+                logger.warning(f"Could not parse the chemical formula: {formula}")
+        return elements
+
 
 m_package.__init_metainfo__()
\ No newline at end of file
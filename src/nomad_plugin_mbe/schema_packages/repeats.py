@@ -0,0 +1,63 @@
+import numpy as np
+
+# Longest superlattice period, in layers, that is searched for.
+MAX_PERIOD = 16
+
+
+def match_runs(ids, period):
+    """
+    Returns for every position i the number of consecutive positions j >= i with
+    ids[j] == ids[j + period], i.e. how far the sequence repeats itself with the
+    period from i on.
+    """
+    n = len(ids) - period
+    if n <= 0:
+        return np.zeros(len(ids), dtype=np.int64)
+    matches = ids[:n] == ids[period:]
+    positions = np.arange(n)
+    # index of the first mismatch at or after every position
+    next_mismatch = np.where(matches, n, positions)
+    next_mismatch = np.minimum.accumulate(next_mismatch[::-1])[::-1]
+    runs = np.zeros(len(ids), dtype=np.int64)
+    runs[:n] = next_mismatch - positions
+    return runs
+
+
+def find_repeats(keys, max_period=MAX_PERIOD, min_repetitions=2):
+    """
+    Finds the repeated periods in a sequence of hashable keys, e.g. one per layer.
+
+    Returns (start, period, repetitions) tuples of non-overlapping blocks in which
+    the `period` keys from start on repeat at least `min_repetitions` times. The
+    sequence is scanned greedily from the left, taking at every position the block
+    that covers the most keys, with the shortest period on ties so that periods are
+    primitive. For each period the repeat run lengths are computed once for all
+    positions, so the cost is O(n * max_period), linear in the length of the
+    sequence.
+    """
+    # every key is replaced by the index of its first occurrence
+    first = {}
+    ids = np.array(
+        [first.setdefault(key, index) for index, key in enumerate(keys)],
+        dtype=np.int64,
+    )
+    periods = range(1, min(max_period, len(ids) // min_repetitions) + 1)
+    runs = {period: match_runs(ids, period) for period in periods}
+
+    blocks = []
+    index = 0
+    while index < len(ids):
+        best = None
+        for period in periods:
+            repetitions = 1 + int(runs[period][index]) // period
+            if repetitions < min_repetitions:
+                continue
+            if best is None or period * repetitions > best[0] * best[1]:
+                best = (period, repetitions)
+        if best is None:
+            index += 1
+            continue
+        period, repetitions = best
+        blocks.append((index, period, repetitions))
+        index += period * repetitions
+    return blocks
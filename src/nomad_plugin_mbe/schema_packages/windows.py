@@ -0,0 +1,78 @@
+import numpy as np
+
+
+def layer_boundaries(growth_times):
+    """
+    Returns the n + 1 boundaries of the growth windows of n layers grown one after
+    the other, in seconds from the start of the growth. The boundaries after a
+    layer without growth time are NaN.
+    """
+    return np.concatenate(
+        [[0.0], np.cumsum(np.asarray(growth_times, dtype=np.float64))]
+    )
+
+
+def window_statistics(time, signal, boundaries):
+    """
+    Computes the statistics of a time series in the windows [boundaries[i],
+    boundaries[i + 1]). The windows are located in the time axis with one binary
+    search and every statistic is one reduceat over the samples, so the cost is
+    O(samples + windows * log(samples)) instead of a scan of the trace per window.
+
+    Returns the number of samples, mean, minimum, maximum and standard deviation
+    of every window, ignoring NaN samples, with NaN for windows without samples or
+    with NaN boundaries.
+    """
+    n = min(len(time), len(signal))
+    time = np.asarray(time[:n], dtype=np.float64)
+    signal = np.asarray(signal[:n], dtype=np.float64)
+    if n and np.any(time[1:] < time[:-1]):
+        order = np.argsort(time, kind='stable')
+        time, signal = time[order], signal[order]
+
+    boundaries = np.asarray(boundaries, dtype=np.float64)
+    indices = np.searchsorted(time, boundaries)
+    starts, stops = indices[:-1], indices[1:]
+    valid = np.isfinite(boundaries[:-1]) & np.isfinite(boundaries[1:])
+    n_windows = len(starts)
+    count = np.zeros(n_windows, dtype=np.int64)
+    mean, minimum, maximum, std = (np.full(n_windows, np.nan) for _ in range(4))
+    nonempty = valid & (stops > starts)
+    if not nonempty.any():
+        return count, mean, minimum, maximum, std
+
+    # Every window is reduced over [start, stop) by interleaving the starts and stops,
+    # the results for the gaps in between are dropped. The pad makes stop == n a valid
+    # index. NaN samples count as zero in the sums and are skipped by fmin and fmax.
+    bounds = np.column_stack([starts[nonempty], stops[nonempty]]).ravel()
+    padded = np.append(signal, 0.0)
+    known = ~np.isnan(padded)
+    known[-1] = False
+    count[nonempty] = np.add.reduceat(known, bounds)[::2]
+    filled = count > 0
+    kept = filled[nonempty]
+    # centering on the overall mean keeps the variance from cancelling out
+    samples = signal[starts[nonempty][0] : stops[nonempty][-1]]
+    samples = samples[np.isfinite(samples)]
+    offset = samples.mean() if len(samples) else 0.0
+    centered = np.where(known, padded - offset, 0.0)
+    sums = np.add.reduceat(centered, bounds)[::2][kept]
+    squares = np.add.reduceat(centered * centered, bounds)[::2][kept]
+    counts = count[filled]
+    mean[filled] = offset + sums / counts
+    variance = np.maximum(squares / counts - (sums / counts) ** 2, 0.0)
+    std[filled] = np.sqrt(variance)
+    minimum[filled] = np.fmin.reduceat(padded, bounds)[::2][kept]
+    maximum[filled] = np.fmax.reduceat(padded, bounds)[::2][kept]
+    return count, mean, minimum, maximum, std
+
+
+def window_indices(boundaries, times):
+    """Returns the window index of every time, -1 for times outside all windows."""
+    boundaries = np.asarray(boundaries, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    known = np.isfinite(boundaries)
+    n_known = int(np.argmin(known)) if not known.all() else len(boundaries)
+    indices = np.searchsorted(boundaries[:n_known], times, side='right') - 1
+    outside = (indices < 0) | (indices >= n_known - 1) | ~np.isfinite(times)
+    return np.where(outside, -1, indices)
@@ -0,0 +1,16 @@
+import pytest
+
+from nomad_plugin_mbe.parsers.synthetic import write_mbe_nexus as write_synthetic_nexus
+
+
+@pytest.fixture
+def write_mbe_nexus(tmp_path):
+    def write(name='growth.nxs', **sizes):
+        return str(write_synthetic_nexus(tmp_path / name, **sizes))
+
+    return write
+
+
+@pytest.fixture
+def mbe_nexus_file(write_mbe_nexus):
+    return write_mbe_nexus()
@@ -0,0 +1,44 @@
+import numpy as np
+
+from nomad_plugin_mbe.parsers.anomalies import AnomalyDetector
+
+
+def detect(signal, block_size, **kwargs):
+    detector = AnomalyDetector(**kwargs)
+    for start in range(0, len(signal), block_size):
+        detector.update(signal[start : start + block_size])
+    events, n_dropped = detector.finish()
+    return [(event.kind, event.direction, event.peak) for event in events], n_dropped
+
+
+def test_anomaly_detector():
+    rng = np.random.default_rng(0)
+    signal = 580 + rng.standard_normal(200_000)
+    signal[5000] += 50  # overshoot
+    signal[120_000:] -= 8  # dropout
+    signal[150_000:150_100] = np.nan  # gap in the recording
+    signal[-10] += 40  # outlier in the last window, without leading window
+
+    expected = [
+        ('outlier', 'rise', 5000),
+        ('change_point', 'drop', 120_000),
+        ('outlier', 'rise', 199_990),
+    ]
+    # the result does not depend on how the trace is split into blocks
+    for block_size in (len(signal), 65536, 1000, 100):
+        assert detect(signal, block_size) == (expected, 0)
+
+    # the trailing window is kept, not the trace
+    detector = AnomalyDetector()
+    detector.update(signal)
+    assert len(detector.tail) < 2 * detector.window
+
+
+def test_anomaly_detector_max_events():
+    signal = np.zeros(100_000)
+    signal[1000::1000] = 1.0
+    n_spikes, max_events = 99, 10
+    events, n_dropped = detect(signal, 4096, max_events=max_events)
+    assert len(events) == max_events
+    assert n_dropped == n_spikes - max_events
+    assert {kind for kind, _, _ in events} == {'outlier'}
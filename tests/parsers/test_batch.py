@@ -0,0 +1,47 @@
+import json
+
+import h5py
+import msgpack
+
+from nomad_plugin_mbe.parsers.batch import main, run_batch
+
+
+def test_batch_parse(write_mbe_nexus, tmp_path):
+    mbe_files = ['growth_a.nxs', 'growth_b.nxs']
+    for name in mbe_files:
+        write_mbe_nexus(name)
+    (tmp_path / 'broken.nxs').write_bytes(b'not an hdf5 file')
+    with h5py.File(tmp_path / 'xrd.nxs', 'w') as hdf:
+        hdf['entry/definition'] = 'NXxrd_pan'
+    h5py.File(tmp_path / 'empty.nxs', 'w').close()
+    output_dir = tmp_path / 'archives'
+
+    n_parsed, skipped, failures = run_batch(tmp_path, output_dir, workers=2)
+
+    assert n_parsed == len(mbe_files)
+    assert skipped == ['empty.nxs', 'xrd.nxs']
+    assert list(failures) == ['broken.nxs']
+    assert not (output_dir / 'xrd.archive.json').exists()
+    assert not (output_dir / 'empty.archive.json').exists()
+    with open(output_dir / 'growth_b.archive.json') as f:
+        assert json.load(f)['data']['title'] == 'HM1234 test growth'
+    with open(output_dir / 'failures.json') as f:
+        assert json.load(f)[0]['mainfile'] == 'broken.nxs'
+
+    # resuming only retries the failed file
+    n_parsed, skipped, failures = run_batch(
+        tmp_path, output_dir, workers=1, resume=True
+    )
+    assert (n_parsed, skipped) == (0, [])
+    assert list(failures) == ['broken.nxs']
+
+
+def test_batch_cli_msgpack(write_mbe_nexus, tmp_path):
+    write_mbe_nexus('growth.nxs')
+    write_mbe_nexus('day.nxs', n_entries=2)
+
+    assert main([str(tmp_path), '--format', 'msgpack', '--workers', '1']) == 0
+    with open(tmp_path / 'growth.archive.msg', 'rb') as f:
+        assert msgpack.unpack(f)['data']['sample']['name'] == 'HM1234DBR'
+    with open(tmp_path / 'day.entry2.archive.msg', 'rb') as f:
+        assert msgpack.unpack(f)['data']['title'] == 'HM1234 test growth entry2'
@@ -0,0 +1,41 @@
+import logging
+import os
+
+from nomad_plugin_mbe.parsers.cache import ParseCache
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = ParseCache(tmp_path, max_bytes=3500)
+    payload = {'data': 'x' * 1000}
+    for index, key in enumerate(['aa01', 'bb02', 'cc03']):
+        cache.put(key, payload)
+        os.utime(cache._path(key), (index, index))
+    # using the oldest entry makes the second oldest the one to evict
+    assert cache.get('aa01') == payload
+    cache.put('dd04', payload)
+
+    assert cache.get('bb02') is None
+    assert cache.get('aa01') == payload
+    assert cache.get('dd04') == payload
+
+
+def test_cache_key_depends_on_content_and_version(tmp_path):
+    cache = ParseCache(tmp_path / 'cache', max_bytes=1 << 20)
+    mainfile = tmp_path / 'growth.nxs'
+    mainfile.write_bytes(b'first')
+    key = cache.key(mainfile, 1)
+    assert cache.key(mainfile, 1) == key
+    assert cache.key(mainfile, 2) != key
+    assert cache.key(mainfile, 1, {'option': True}) != key
+    mainfile.write_bytes(b'second')
+    assert cache.key(mainfile, 1) != key
+
+
+def test_cache_put_write_failure(tmp_path, caplog):
+    cache = ParseCache(tmp_path, max_bytes=1 << 20)
+    cache._path('aa01').parent.write_text('not a directory')
+    cache.put('aa01', {'data': 'x'}, logging.getLogger())
+    assert cache.get('aa01') is None
+    assert 'Could not write the parse result to the cache' in caplog.text
+    cache.put('bb02', {'data': 'x'})
+    assert cache.get('bb02') == {'data': 'x'}
@@ -0,0 +1,46 @@
+import h5py
+import numpy as np
+
+from nomad_plugin_mbe.parsers.files import FileAccess, missing_filters
+
+
+def test_file_access_chunk_cache(tmp_path):
+    mainfile = tmp_path / 'paged.nxs'
+    value = np.arange(1000.0)
+    with h5py.File(mainfile, 'w', fs_strategy='page') as hdf:
+        hdf.create_dataset('value', data=value, chunks=(100,), compression='gzip')
+    with open(mainfile, 'rb') as f:
+        contents = f.read()
+
+    access = FileAccess(
+        chunk_cache_bytes=4 << 20, chunk_cache_slots=521, page_buffer_bytes=1 << 16
+    )
+    for source, threshold, in_memory in (
+        (mainfile, 0, True),
+        (mainfile, 1 << 20, True),
+        (mainfile, 1 << 20, False),
+        (contents, 0, True),
+    ):
+        access.in_memory_max_bytes = threshold
+        hdf, held = access.open(source, in_memory=in_memory)
+        with hdf:
+            assert held == (in_memory and (threshold > 0 or source is contents))
+            assert (hdf.driver == 'core') == held
+            _, slots, nbytes, _ = hdf.id.get_access_plist().get_cache()
+            assert (slots, nbytes) == (521, 4 << 20)
+            assert hdf.id.get_access_plist().get_page_buffer_size()[0] == 1 << 16
+            assert hdf['value'][-1] == value[-1]
+            assert missing_filters(hdf['value']) == []
+
+
+def test_missing_filters(tmp_path):
+    with h5py.File(tmp_path / 'blosc.nxs', 'w') as hdf:
+        hdf.create_dataset(
+            'value',
+            data=np.arange(10.0),
+            chunks=(5,),
+            compression=32001,
+            allow_unknown_filter=True,
+        )
+        if not h5py.h5z.filter_avail(32001):
+            assert missing_filters(hdf['value']) == ['filter 32001']
@@ -0,0 +1,771 @@
+import io
+import logging
+import zipfile
+
+import h5py
+import numpy as np
+import pytest
+import structlog.testing
+from nomad.client import normalize_all
+from nomad.datamodel import EntryArchive, EntryMetadata
+
+from nomad_plugin_mbe.parsers.mbe_parser import HDF5MBEParser
+from nomad_plugin_mbe.schema_packages.envelope import COARSE_BINS
+from nomad_plugin_mbe.schema_packages.mbe_schema import LayerDescription, MaterialSource
+
+
+def test_parse_mbe_file(mbe_nexus_file):
+    start_hour = 9
+    n_layers = n_cells = 2
+    layer_thickness = 30.0
+    parser = HDF5MBEParser()
+    archive = EntryArchive()
+    parser.parse(mbe_nexus_file, archive, logging.getLogger())
+
+    entry = archive.data
+    assert entry.title == 'HM1234 test growth'
+    assert entry.growth_description == 'Molecular Beam Epitaxy'
+    assert entry.start_time.hour == start_hour
+    assert len(entry.user) == 1
+    assert entry.user[0].role == 'operator'
+
+    chamber = entry.instrument.chamber
+    assert chamber.model == 'Riber 32'
+    assert chamber.cooling_device.cooling_mode == 'liquid_nitrogen'
+    assert [sensor.name for sensor in chamber.sensor] == ['sensor 1', 'sensor 2']
+
+    sample = entry.sample
+    assert sample.substrate.chemical_formula == 'GaAs'
+    assert len(sample.layer) == n_layers
+    assert sample.layer[1].chemical_formula == 'AlAs'
+    assert sample.layer[0].thickness.magnitude == layer_thickness
+    assert len(sample.layer[0].cell) == n_cells
+    assert sample.layer[0].cell[1].shutter_status == 'open'
+    assert sample.layer[0].growth_rate is not None
+    assert sample.layer[0].doping is None
+
+
+def test_parse_without_group_caps(write_mbe_nexus):
+    n_layers, n_cells, n_sensors, n_users = 120, 6, 9, 6
+    mainfile = write_mbe_nexus(
+        n_layers=n_layers, n_cells=n_cells, n_sensors=n_sensors, n_users=n_users
+    )
+    archive = EntryArchive()
+    HDF5MBEParser().parse(mainfile, archive, logging.getLogger())
+
+    entry = archive.data
+    assert len(entry.user) == n_users
+    assert len(entry.instrument.chamber.sensor) == n_sensors
+    assert entry.instrument.chamber.sensor[8].name == 'sensor 9'
+    layers = entry.sample.layer
+    assert [layer.name for layer in layers] == [
+        f'layer {i}' for i in range(1, n_layers + 1)
+    ]
+    assert all(len(layer.cell) == n_cells for layer in layers)
+
+
+def test_parse_columnar_layers(tmp_path):
+    mainfile = str(tmp_path / 'columnar.nxs')
+    n_layers = 50
+    max_temperature, rotational_frequency = 590.0, 10.0
+    with h5py.File(mainfile, 'w') as hdf:
+        layers = hdf.create_group('entry/sample/layers')
+        layers['name'] = [f'layer {i}'.encode() for i in range(n_layers)]
+        layers['chemical_formula'] = [b'GaAs', b'AlAs'] * (n_layers // 2)
+        layers['thickness'] = np.full(n_layers, 30.0)
+        layers['growth_temperature'] = np.linspace(570.0, max_temperature, n_layers)
+        layers['doping'] = np.full(n_layers, np.nan)
+        layers['rotational_frequency'] = rotational_frequency
+        cell = layers.create_group('cell_1')
+        cell['name'] = [b'Ga'] * n_layers
+        cell['shutter_status'] = [b'open', b'closed'] * (n_layers // 2)
+        cell['partial_growth_rate'] = np.ones(n_layers)
+
+    archive = EntryArchive()
+    HDF5MBEParser().parse(mainfile, archive, logging.getLogger())
+
+    layers = archive.data.sample.layer
+    assert len(layers) == n_layers
+    assert layers[49].name == 'layer 49'
+    assert layers[1].chemical_formula == 'AlAs'
+    assert layers[-1].growth_temperature.magnitude == max_temperature
+    assert layers[3].rotational_frequency.magnitude == rotational_frequency
+    assert layers[0].doping is None
+    assert [layer.cell[0].shutter_status for layer in layers[:2]] == ['open', 'closed']
+
+
+def test_parse_sensor_time_series(mbe_nexus_file):
+    n_samples = 10_000
+    with h5py.File(mbe_nexus_file, 'a') as hdf:
+        chamber = hdf['entry/instrument/chamber']
+        sensor = chamber['sensor_1']
+        del sensor['value']
+        sensor.create_dataset(
+            'value',
+            data=np.arange(n_samples, dtype='f4'),
+            chunks=(1000,),
+            compression='gzip',
+        )
+        sensor.create_dataset('time', data=np.arange(n_samples) * 0.1)
+        nominal_value = chamber['sensor_2/value'][()]
+        value_log = chamber['sensor_2'].create_group('value_log')
+        value_log['value'] = np.array([1.0, 3.0])
+        value_log['time'] = np.array([0.0, 500.0])
+        value_log['time'].attrs['units'] = 'ms'
+        value_log['time'].attrs['start'] = '2024-05-02T09:31:00'
+
+    archive = EntryArchive()
+    HDF5MBEParser().parse(mbe_nexus_file, archive, logging.getLogger())
+
+    sensor, log_sensor = archive.data.instrument.chamber.sensor
+    assert sensor.sample_count == n_samples
+    assert sensor.signal.shape == (n_samples,)
+    assert sensor.value == np.mean(np.arange(n_samples))
+    assert sensor.value_max == n_samples - 1
+    assert np.isclose(sensor.value_std, np.std(np.arange(n_samples)))
+    assert sensor.time[-1].magnitude == (n_samples - 1) * 0.1
+    assert log_sensor.value == nominal_value
+    assert list(log_sensor.time.magnitude) == [60.0, 60.5]
+
+
+def test_parse_non_numeric_time_series(mbe_nexus_file, caplog):
+    with h5py.File(mbe_nexus_file, 'a') as hdf:
+        sensor = hdf['entry/instrument/chamber/sensor_1']
+        del sensor['value']
+        sensor['value'] = np.arange(3.0)
+        sensor['time'] = np.array(
+            ['2024-05-02T09:31:00', '2024-05-02T09:31:01', '2024-05-02T09:31:02'],
+            dtype='S',
+        )
+
+    archive = EntryArchive()
+    HDF5MBEParser().parse(mbe_nexus_file, archive, logging.getLogger())
+
+    sensor = archive.data.instrument.chamber.sensor[0]
+    assert sensor.signal is None and sensor.time is None
+    assert "non-numeric 'time'" in caplog.text
+
+
+def test_parse_result_cache(mbe_nexus_file, tmp_path, monkeypatch):
+    parser = HDF5MBEParser(cache_dir=str(tmp_path / 'cache'))
+    archive = EntryArchive()
+    parser.parse(mbe_nexus_file, archive, logging.getLogger())
+
+    def fail(*args, **kwargs):
+        raise AssertionError('cached file must not be reopened')
+
+    monkeypatch.setattr(h5py, 'File', fail)
+    cached_archive = EntryArchive()
+    parser.parse(mbe_nexus_file, cached_archive, logging.getLogger())
+    assert cached_archive.data.m_to_dict() == archive.data.m_to_dict()
+
+    # a parser that accepts other entries does not reuse the cached result
+    monkeypatch.undo()
+    parser = HDF5MBEParser(cache_dir=str(tmp_path / 'cache'), definition_re='NXmbe')
+    parser.parse(mbe_nexus_file, EntryArchive(), logging.getLogger())
+    assert not parser.last_trace.cache_hit
+
+
+def test_parse_result_cache_not_writable(mbe_nexus_file, tmp_path, caplog):
+    cache_dir = tmp_path / 'cache'
+    cache_dir.write_text('not a directory')
+    archive = EntryArchive()
+    HDF5MBEParser(cache_dir=str(cache_dir)).parse(
+        mbe_nexus_file, archive, logging.getLogger()
+    )
+    assert archive.data.title == 'HM1234 test growth'
+    assert 'Could not write the parse result to the cache' in caplog.text
+
+
+def test_follow_growing_file(mbe_nexus_file):
+    def append_samples(sensor, n_samples):
+        for key in ('time', 'value'):
+            sensor[key].resize((n_samples,))
+        sensor['time'][:] = np.arange(n_samples)
+        sensor['value'][:] = np.arange(n_samples) * 2.0
+
+    with h5py.File(mbe_nexus_file, 'a') as hdf:
+        sensor = hdf['entry/instrument/chamber/sensor_1']
+        del sensor['value']
+        for key in ('time', 'value'):
+            sensor.create_dataset(
+                key, shape=(0,), maxshape=(None,), chunks=(64,), dtype='f8'
+            )
+        append_samples(sensor, 100)
+
+    archive = EntryArchive()
+    follower = HDF5MBEParser().follow(mbe_nexus_file, archive, logging.getLogger())
+    assert follower.refresh() == (2, 100)
+    assert follower.refresh() == (0, 0)
+
+    n_samples = 150
+    with h5py.File(mbe_nexus_file, 'a') as hdf:
+        layer = hdf['entry/sample'].create_group('layer03')
+        layer['name'] = 'layer 3'
+        append_samples(hdf['entry/instrument/chamber/sensor_1'], n_samples)
+
+    assert follower.refresh() == (1, 50)
+    entry = archive.data
+    assert [layer.name for layer in entry.sample.layer] == [
+        'layer 1',
+        'layer 2',
+        'layer 3',
+    ]
+    assert len(entry.user) == 1
+    sensor = entry.instrument.chamber.sensor[0]
+    assert np.array_equal(sensor.signal, np.arange(n_samples) * 2.0)
+    assert sensor.time[-1].magnitude == n_samples - 1
+    assert sensor.sample_count == n_samples
+    assert sensor.value == np.mean(np.arange(n_samples) * 2.0)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_follow_layer_written_between_refreshes(mbe_nexus_file, compact):
+    with h5py.File(mbe_nexus_file, 'a') as hdf:
+        hdf['entry/sample/layer03/name'] = 'layer 3'
+
+    archive = EntryArchive()
+    follower = HDF5MBEParser(compact_layers=compact).follow(
+        mbe_nexus_file, archive, logging.getLogger()
+    )
+    assert follower.refresh() == (3, 0)
+
+    with h5py.File(mbe_nexus_file, 'a') as hdf:
+        layer = hdf['entry/sample/layer03']
+        layer['thickness'] = 25.0
+        layer.create_group('cell_1')['name'] = 'Ga'
+
+    assert follower.refresh() == (0, 0)
+    layers = archive.data.sample.layer_views()
+    assert [layer.name for layer in layers] == ['layer 1', 'layer 2', 'layer 3']
+    assert (layers[2].cell[0].name, layers[2].thickness.magnitude) == ('Ga', 25.0)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_follow_columnar_layers(tmp_path, compact):
+    mainfile = str(tmp_path / 'columnar.nxs')
+    with h5py.File(mainfile, 'w', libver='latest') as hdf:
+        layers = hdf.create_group('entry/sample/layers')
+        for key, dtype in (('name', h5py.string_dtype()), ('thickness', 'f8')):
+            layers.create_dataset(key, shape=(0,), maxshape=(None,), dtype=dtype)
+
+    def write_rows(key, values):
+        with h5py.File(mainfile, 'a') as hdf:
+            dataset = hdf['entry/sample/layers'][key]
+            dataset.resize((len(values),))
+            dataset[:] = values
+
+    archive = EntryArchive()
+    follower = HDF5MBEParser(compact_layers=compact).follow(
+        mainfile, archive, logging.getLogger()
+    )
+    write_rows('name', ['layer 1', 'layer 2'])
+    write_rows('thickness', [10.0])
+    assert follower.refresh() == (2, 0)
+
+    write_rows('thickness', [10.0, 20.0])
+    write_rows('name', ['layer 1', 'layer 2', 'layer 3'])
+    assert follower.refresh() == (1, 0)
+    layers = archive.data.sample.layer_views()
+    assert [layer.name for layer in layers] == ['layer 1', 'layer 2', 'layer 3']
+    assert [layer.thickness.magnitude for layer in layers[:2]] == [10.0, 20.0]
+
+    write_rows('thickness', [10.0, 20.0, 30.0])
+    assert follower.refresh() == (0, 0)
+    assert [
+        layer.thickness.magnitude for layer in archive.data.sample.layer_views()
+    ] == [10.0, 20.0, 30.0]
+
+
+def test_follow_multiple_entries(write_mbe_nexus):
+    mainfile = write_mbe_nexus(n_layers=3, n_entries=2)
+    archive = EntryArchive()
+    assert HDF5MBEParser().follow(mainfile, archive, logging.getLogger()).refresh() == (
+        3,
+        0,
+    )
+    assert archive.data.title == 'HM1234 test growth entry1'
+
+    archive = EntryArchive()
+    follower = HDF5MBEParser().follow(
+        mainfile, archive, logging.getLogger(), entry='entry2'
+    )
+    assert follower.refresh() == (3, 0)
+    assert archive.data.title == 'HM1234 test growth entry2'
+
+
+def test_parse_lazy(write_mbe_nexus):
+    n_layers = 20
+    mainfile = write_mbe_nexus(n_layers=n_layers, n_sensors=3)
+    parser = HDF5MBEParser()
+    archive = EntryArchive()
+    parser.parse_lazy(mainfile, archive, logging.getLogger())
+
+    entry = archive.data
+    assert entry.title == 'HM1234 test growth'
+    assert entry.sample.substrate.name == 'W-42'
+    layers = entry.sample.layer
+    assert len(layers) == n_layers
+    assert layers.loaded == 0
+    # a lazy parse reads only what is accessed, small files are not read whole
+    hdf = parser.handles.get(mainfile)
+    assert hdf.driver != 'core'
+    _, _, nbytes, _ = hdf.id.get_access_plist().get_cache()
+    assert nbytes == parser.file_access.chunk_cache_bytes
+
+    assert layers[-1].name == 'layer 20'
+    assert layers[-1].cell[0].name == 'cell 1'
+    assert layers[-1].m_parent is entry.sample
+    assert layers.loaded == 1
+    assert entry.instrument.chamber.sensor.loaded == 0
+
+    eager_archive = EntryArchive()
+    parser.parse(mainfile, eager_archive, logging.getLogger())
+    assert archive.data.m_to_dict() == eager_archive.data.m_to_dict()
+    assert layers.loaded == n_layers
+    parser.handles.close()
+
+
+def test_is_mainfile(mbe_nexus_file, tmp_path):
+    def is_mainfile(path):
+        with open(path, 'rb') as f:
+            buffer = f.read(2048)
+        return HDF5MBEParser().is_mainfile(path, 'application/x-hdf5', buffer, None)
+
+    xrd_file = str(tmp_path / 'xrd.nxs')
+    with h5py.File(xrd_file, 'w') as hdf:
+        hdf['entry/definition'] = 'NXxrd_pan'
+    text_file = tmp_path / 'notes.nxs'
+    text_file.write_text('not hdf5')
+
+    assert is_mainfile(mbe_nexus_file)
+    assert not is_mainfile(xrd_file)
+    assert not is_mainfile(str(text_file))
+
+
+def test_parse_other_definition(tmp_path, caplog):
+    xrd_file = str(tmp_path / 'xrd.nxs')
+    with h5py.File(xrd_file, 'w') as hdf:
+        hdf['entry/definition'] = 'NXxrd_pan'
+        hdf['entry/title'] = 'XRD scan'
+    archive = EntryArchive()
+    with caplog.at_level(logging.ERROR):
+        HDF5MBEParser().parse(xrd_file, archive, logging.getLogger())
+    assert archive.data is None
+    assert 'no entry with an MBE application definition' in caplog.text
+
+    caplog.clear()
+    parser = HDF5MBEParser()
+    with caplog.at_level(logging.ERROR):
+        parser.parse_lazy(xrd_file, archive, logging.getLogger())
+    parser.handles.close()
+    assert archive.data is None
+    assert 'no entry with an MBE application definition' in caplog.text
+
+
+def test_parse_trace(write_mbe_nexus):
+    n_layers, n_cells = 3, 2
+    mainfile = write_mbe_nexus(n_layers=n_layers, n_cells=n_cells)
+    parser = HDF5MBEParser(detailed_trace=True)
+    parser.parse(mainfile, EntryArchive(), logging.getLogger())
+
+    summary = parser.last_trace.summary()
+    assert summary['section_counts']['layer'] == n_layers
+    assert summary['section_counts']['cell'] == n_layers * n_cells
+    assert summary['datasets_read'] > 0
+    assert summary['bytes_read'] > 0
+    assert summary['file_open_seconds'] > 0
+    assert sum(summary['section_seconds'].values()) <= summary['parse_seconds']
+    (entry_span,) = [
+        node for node in summary['span_tree']['children'] if node['name'] == 'entry'
+    ]
+    sample_span = [node for node in entry_span['children'] if node['name'] == 'sample'][
+        0
+    ]
+    assert [node['name'] for node in sample_span['children']] == [
+        'substrate',
+        'layer',
+        'layer',
+        'layer',
+    ]
+
+
+def test_parse_summary_event(mbe_nexus_file, caplog):
+    caplog.set_level(logging.INFO)
+    HDF5MBEParser().parse(mbe_nexus_file, EntryArchive(), logging.getLogger())
+    (record,) = [
+        record
+        for record in caplog.records
+        if record.msg == 'HDF5MBEParser.parse summary'
+    ]
+    assert record.mainfile == mbe_nexus_file
+    assert record.datasets_read > 0
+
+    with structlog.testing.capture_logs() as events:
+        HDF5MBEParser().parse(mbe_nexus_file, EntryArchive(), structlog.get_logger())
+    (event,) = [
+        event for event in events if event['event'] == 'HDF5MBEParser.parse summary'
+    ]
+    assert event['section_counts'] == record.section_counts
+
+
+def test_parse_in_memory(write_mbe_nexus):
+    mainfile = write_mbe_nexus(n_layers=4, n_samples=1000)
+    archives = {}
+    for threshold in (0, 1 << 20):
+        parser = HDF5MBEParser(in_memory_max_bytes=threshold)
+        archives[threshold] = EntryArchive()
+        parser.parse(mainfile, archives[threshold], logging.getLogger())
+        assert parser.last_trace.in_memory == bool(threshold)
+
+    assert archives[0].data.m_to_dict() == archives[1 << 20].data.m_to_dict()
+
+    parser = HDF5MBEParser(in_memory_max_bytes=100)
+    parser.parse(mainfile, EntryArchive(), logging.getLogger())
+    assert not parser.last_trace.in_memory
+
+
+class ForwardOnlyStream(io.RawIOBase):
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+
+def test_parse_from_file_objects_and_buffers(write_mbe_nexus, tmp_path):
+    mainfile = write_mbe_nexus(n_layers=3, n_samples=100)
+    expected = EntryArchive()
+    HDF5MBEParser().parse(mainfile, expected, logging.getLogger())
+    with open(mainfile, 'rb') as f:
+        contents = f.read()
+    bundle = tmp_path / 'bundle.zip'
+    with zipfile.ZipFile(bundle, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.write(mainfile, 'growth.nxs')
+
+    sources = [
+        (contents, 1 << 20),
+        (memoryview(contents), 1 << 20),
+        (ForwardOnlyStream(contents), 1 << 20),
+        (io.BytesIO(contents), 0),
+    ]
+    for source, threshold in sources:
+        archive = EntryArchive()
+        HDF5MBEParser(in_memory_max_bytes=threshold).parse(
+            source, archive, logging.getLogger()
+        )
+        assert archive.data.m_to_dict() == expected.data.m_to_dict()
+
+    for threshold in (0, 1 << 20):
+        with zipfile.ZipFile(bundle) as zip_file, zip_file.open('growth.nxs') as member:
+            archive = EntryArchive()
+            parser = HDF5MBEParser(in_memory_max_bytes=threshold)
+            parser.parse(member, archive, logging.getLogger())
+        assert parser.last_trace.in_memory == bool(threshold)
+        assert archive.data.m_to_dict() == expected.data.m_to_dict()
+
+
+def test_parse_multiple_entries(write_mbe_nexus, tmp_path):
+    n_layers = 3
+    mainfile = write_mbe_nexus(n_layers=n_layers, n_entries=3)
+    with h5py.File(mainfile, 'a') as hdf:
+        hdf['xrd/definition'] = 'NXxrd_pan'
+        hdf['xrd'].attrs['NX_class'] = 'NXentry'
+    with open(mainfile, 'rb') as f:
+        buffer = f.read(2048)
+    parser = HDF5MBEParser(cache_dir=str(tmp_path / 'cache'))
+    keys = parser.is_mainfile(mainfile, 'application/x-hdf5', buffer, None)
+    assert keys == {'entry2', 'entry3'}
+
+    for cache_hit in (False, True):
+        archive = EntryArchive()
+        child_archives = {key: EntryArchive() for key in sorted(keys)}
+        parser.parse(
+            mainfile, archive, logging.getLogger(), child_archives=child_archives
+        )
+        assert parser.last_trace.cache_hit == cache_hit
+        assert parser.last_trace.section_counts.get('file_open', 0) == (
+            0 if cache_hit else 1
+        )
+        assert archive.data.title == 'HM1234 test growth entry1'
+        for key, child_archive in child_archives.items():
+            assert child_archive.data.title == f'HM1234 test growth {key}'
+            assert len(child_archive.data.sample.layer) == n_layers
+
+
+def test_parse_compact_layers(write_mbe_nexus):
+    n_layers, n_cells = 12, 3
+    for columnar in (False, True):
+        mainfile = write_mbe_nexus(
+            f'stack_{columnar}.nxs',
+            n_layers=n_layers,
+            n_cells=n_cells,
+            columnar=columnar,
+        )
+        archives = {}
+        for compact in (False, True):
+            archives[compact] = EntryArchive()
+            HDF5MBEParser(compact_layers=compact).parse(
+                mainfile, archives[compact], logging.getLogger()
+            )
+
+        sample = archives[True].data.sample
+        assert not sample.layer
+        assert sample.n_compact_layers == n_layers
+        assert len(sample.layer_cell) == n_cells
+        thickness = sample.layer_thickness.to('angstrom').magnitude
+        assert thickness.tolist() == [30.0] * n_layers
+        views = sample.layer_views()
+        layers = archives[False].data.sample.layer_views()
+        assert len(views) == len(layers) == n_layers
+        for layer, view in zip(layers, views):
+            for name in LayerDescription.m_def.all_quantities:
+                assert getattr(view, name) == getattr(layer, name)
+            assert len(view.cell) == len(layer.cell)
+            for cell, cell_view in zip(layer.cell, view.cell):
+                for name in MaterialSource.m_def.all_quantities:
+                    assert getattr(cell_view, name) == getattr(cell, name)
+
+
+def test_parse_compact_layers_invalid_enum(write_mbe_nexus, caplog):
+    for columnar in (False, True):
+        mainfile = write_mbe_nexus(f'stack_{columnar}.nxs', columnar=columnar)
+        with h5py.File(mainfile, 'a') as hdf:
+            if columnar:
+                cell = hdf['entry/sample/layers/cell_1']
+                cell['shutter_status'][0] = 'half'
+            else:
+                cell = hdf['entry/sample/layer01/cell_1']
+                del cell['shutter_status']
+                cell['shutter_status'] = 'half'
+        caplog.clear()
+        archive = EntryArchive()
+        HDF5MBEParser(compact_layers=True).parse(mainfile, archive, logging.getLogger())
+
+        cell = archive.data.sample.layer_cell[0]
+        assert list(cell.shutter_status) == ['', 'open']
+        assert "'half' are not allowed for 'shutter_status'" in caplog.text
+
+
+def test_parse_detect_repeats(write_mbe_nexus):
+    n_layers, cap_thickness = 81, 500.0
+    mainfile = write_mbe_nexus(n_layers=n_layers)
+    with h5py.File(mainfile, 'a') as hdf:
+        hdf['entry/sample/layer81/thickness'][()] = cap_thickness
+    archive = EntryArchive()
+    HDF5MBEParser(detect_repeats=True).parse(mainfile, archive, logging.getLogger())
+
+    sample = archive.data.sample
+    (block,) = sample.repeat_block
+    assert (block.start_index, block.repetitions) == (0, 40)
+    assert block.period_sequence == 'GaAs/AlAs'
+    assert block.period_thickness == 2 * block.layer[0].thickness
+    assert [layer.name for layer in block.layer] == ['layer 1', 'layer 2']
+    assert [layer.name for layer in sample.layer] == ['layer 81']
+    layers = sample.layer_views()
+    assert len(layers) == n_layers
+    assert [layer.chemical_formula for layer in layers[:4]] == [
+        'GaAs',
+        'AlAs',
+        'GaAs',
+        'AlAs',
+    ]
+    assert [layer.name for layer in layers] == [
+        f'layer {index}' for index in range(1, n_layers + 1)
+    ]
+    assert layers[2].thickness == layers[0].thickness
+    assert layers[-1].thickness.to('angstrom').magnitude == cap_thickness
+
+
+def test_normalize_elements(write_mbe_nexus):
+    mainfile = write_mbe_nexus(n_layers=4)
+    with h5py.File(mainfile, 'a') as hdf:
+        del hdf['entry/sample/layer03/chemical_formula']
+        hdf['entry/sample/layer03/chemical_formula'] = 'InGaAs'
+        hdf['entry/sample/layer03/alloy_fraction'] = 0.2
+    archive = EntryArchive(metadata=EntryMetadata())
+    HDF5MBEParser().parse(mainfile, archive, logging.getLogger())
+    normalize_all(archive)
+
+    assert archive.results.material.elements == ['Al', 'As', 'Ga', 'In']
+    layers = archive.data.sample.layer
+    assert [layer.reduced_formula for layer in layers] == [
+        'GaAs',
+        'AlAs',
+        'In0.2Ga0.8As',
+        'AlAs',
+    ]
+    assert archive.data.sample.substrate.reduced_formula == 'GaAs'
+
+
+def test_normalize_stack_summary(write_mbe_nexus):
+    n_layers, layer_thickness, cap_thickness = 81, 30.0, 500.0
+    mainfile = write_mbe_nexus(n_layers=n_layers)
+    with h5py.File(mainfile, 'a') as hdf:
+        layer = hdf['entry/sample/layer81']
+        layer['thickness'][()] = cap_thickness
+        del layer['chemical_formula']
+        layer['chemical_formula'] = 'InGaAs'
+        layer['alloy_fraction'] = 0.2
+    summaries = []
+    for options in ({}, dict(compact_layers=True), dict(detect_repeats=True)):
+        archive = EntryArchive(metadata=EntryMetadata())
+        HDF5MBEParser(**options).parse(mainfile, archive, logging.getLogger())
+        normalize_all(archive)
+        summaries.append(archive.data.stack_summary.m_to_dict())
+
+    summary = archive.data.stack_summary
+    assert summary.n_layers == n_layers
+    assert summary.total_thickness.to('angstrom').magnitude == (
+        (n_layers - 1) * layer_thickness + cap_thickness
+    )
+    assert summary.min_layer_thickness.to('angstrom').magnitude == layer_thickness
+    assert summary.max_layer_thickness.to('angstrom').magnitude == cap_thickness
+    assert summary.cell_names
+    assert list(summary.reduced_formulas) == ['AlAs', 'GaAs', 'In0.2Ga0.8As']
+    assert summaries[0] == summaries[1] == summaries[2]
+
+
+def test_normalize_in_bulk(write_mbe_nexus):
+    mainfile = write_mbe_nexus(n_layers=40, n_sensors=6)
+    with h5py.File(mainfile, 'a') as hdf:
+        del hdf['entry/sample/layer03/chemical_formula']
+        hdf['entry/sample/layer03/chemical_formula'] = 'InGaAs'
+        hdf['entry/sample/layer03/alloy_fraction'] = 0.2
+    archive = EntryArchive(metadata=EntryMetadata())
+    HDF5MBEParser(detect_repeats=True).parse(mainfile, archive, logging.getLogger())
+    normalize_all(archive)
+
+    # every section normalized on its own, outside of an MBESynthesis entry
+    reference = EntryArchive(metadata=EntryMetadata())
+    HDF5MBEParser(detect_repeats=True).parse(mainfile, reference, logging.getLogger())
+    sections = [
+        *reference.data.sample.distinct_layers(),
+        *reference.data.instrument.chamber.sensor,
+    ]
+    for section in sections:
+        section.normalize(EntryArchive(), logging.getLogger())
+
+    layers = archive.data.sample.distinct_layers()
+    assert [layer.reduced_formula for layer in layers] == [
+        layer.reduced_formula for layer in reference.data.sample.distinct_layers()
+    ]
+    assert 'In0.2Ga0.8As' in [layer.reduced_formula for layer in layers]
+    sensors = archive.data.instrument.chamber.sensor
+    assert [sensor.value_unit for sensor in sensors] == [
+        sensor.value_unit for sensor in reference.data.instrument.chamber.sensor
+    ]
+    assert all(sensor.value_unit for sensor in sensors)
+
+
+def test_normalize_growth_rate_calibration(write_mbe_nexus):
+    n_layers, n_cells = 20, 2
+    mainfile = write_mbe_nexus(n_layers=n_layers, n_cells=n_cells)
+    with h5py.File(mainfile, 'a') as hdf:
+        for index in range(2, n_layers + 1, 2):
+            layer = hdf[f'entry/sample/layer{index:02d}']
+            del layer['cell_2/shutter_status']
+            layer['cell_2/shutter_status'] = 'closed'
+            layer['growth_rate'][()] = 0.5
+        hdf['entry/sample/layer05/growth_rate'][()] = 1.5
+
+    for compact in (False, True):
+        archive = EntryArchive(metadata=EntryMetadata())
+        HDF5MBEParser(compact_layers=compact).parse(
+            mainfile, archive, logging.getLogger()
+        )
+        normalize_all(archive)
+
+        calibration = archive.data.growth_rate_calibration
+        assert calibration.cell_name == ['cell 1', 'cell 2']
+        assert calibration.rank == n_cells
+        assert calibration.n_fitted_layers == n_layers
+        np.testing.assert_allclose(
+            calibration.nominal_rate.to('angstrom/s').magnitude, [0.5, 0.5]
+        )
+        np.testing.assert_allclose(
+            calibration.fitted_rate.to('angstrom/s').magnitude, [0.5, 0.55]
+        )
+        assert list(calibration.inconsistent_layer_index) == [4]
+
+
+def test_normalize_layer_sensor_statistics(write_mbe_nexus):
+    mainfile = write_mbe_nexus(n_layers=10, n_sensors=2, n_samples=1000)
+    for compact in (False, True):
+        archive = EntryArchive(metadata=EntryMetadata())
+        HDF5MBEParser(compact_layers=compact).parse(
+            mainfile, archive, logging.getLogger()
+        )
+        normalize_all(archive)
+
+        sensor = archive.data.instrument.chamber.sensor[0]
+        statistics = archive.data.sample.layer_sensor[0]
+        assert statistics.sensor_name == sensor.name
+        assert statistics.value_unit == sensor.value_unit
+        # 30 s per layer sampled at 10 Hz, the trace ends after 100 s
+        assert list(statistics.sample_count) == [300, 300, 300, 100] + [0] * 6
+        layer_seconds = 30
+        time = sensor.time.to('s').magnitude
+        window = sensor.signal[(time >= layer_seconds) & (time < 2 * layer_seconds)]
+        np.testing.assert_allclose(statistics.value_mean[1], window.mean())
+        np.testing.assert_allclose(statistics.value_std[1], window.std())
+        assert np.isnan(statistics.value_mean[4:]).all()
+
+
+def test_normalize_sensor_envelope(write_mbe_nexus):
+    mainfile = write_mbe_nexus(n_sensors=1, n_samples=200_000)
+    archive = EntryArchive(metadata=EntryMetadata())
+    HDF5MBEParser().parse(mainfile, archive, logging.getLogger())
+    normalize_all(archive)
+
+    sensor = archive.data.instrument.chamber.sensor[0]
+    assert [level.bin_size for level in sensor.envelope] == [256, 128, 64]
+    coarse = sensor.envelope[0]
+    assert len(coarse.time) <= COARSE_BINS
+    assert coarse.value_min.min() == sensor.signal.min()
+    assert coarse.value_max.max() == sensor.signal.max()
+
+    # short traces are plotted at full resolution
+    mainfile = write_mbe_nexus('short.nxs', n_sensors=1, n_samples=500)
+    archive = EntryArchive(metadata=EntryMetadata())
+    HDF5MBEParser().parse(mainfile, archive, logging.getLogger())
+    normalize_all(archive)
+    sensor = archive.data.instrument.chamber.sensor[0]
+    (level,) = sensor.envelope
+    assert level.bin_size == 1
+    np.testing.assert_array_equal(level.value_max, sensor.signal)
+
+
+def test_parse_sensor_anomalies(write_mbe_nexus):
+    mainfile = write_mbe_nexus(n_layers=40, n_sensors=3, n_samples=20_000)
+    # sampled at 10 Hz, 30 s per layer
+    burst_index, dropout_index = 5000, 9000
+    with h5py.File(mainfile, 'a') as hdf:
+        chamber = hdf['entry/instrument/chamber']
+        chamber['sensor_1/value'][burst_index] *= 1.5  # pressure burst
+        chamber['sensor_3/value'][dropout_index:] *= 0.5  # reflectivity dropout
+    archive = EntryArchive(metadata=EntryMetadata())
+    HDF5MBEParser(detect_anomalies=True).parse(mainfile, archive, logging.getLogger())
+    normalize_all(archive)
+
+    pressure, temperature, reflectivity = archive.data.instrument.chamber.sensor
+    (burst,) = pressure.anomaly
+    assert (burst.kind, burst.direction, burst.start_index) == (
+        'outlier',
+        'rise',
+        burst_index,
+    )
+    assert burst.peak_time.to('s').magnitude == burst_index / 10
+    assert burst.layer_index == burst_index // 300
+    assert not temperature.anomaly
+    (dropout,) = reflectivity.anomaly
+    assert (dropout.kind, dropout.direction) == ('change_point', 'drop')
+    assert dropout.peak_time.to('s').magnitude == dropout_index / 10
+    assert dropout.layer_index == dropout_index // 300
+
+    archive = EntryArchive()
+    HDF5MBEParser().parse(mainfile, archive, logging.getLogger())
+    assert not archive.data.instrument.chamber.sensor[0].anomaly
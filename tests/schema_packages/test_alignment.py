@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from nomad_plugin_mbe.schema_packages.alignment import align_series, common_timebase
+from nomad_plugin_mbe.schema_packages.mbe_schema import (
+    SampleGrowingEnvironment,
+    SensorDescription,
+)
+
+
+def test_align_series():
+    # a 10 Hz trace from 0 s and a 1 Hz trace from 2 s, unsorted, with a NaN sample
+    fast_time = np.arange(100) / 10.0
+    slow_start, slow_stop, nan_time = 2.0, 13.0, 6.0
+    slow_time = np.arange(slow_start, slow_stop + 1.0)[::-1]
+    slow_signal = 3.0 * slow_time
+    slow_signal[slow_time == nan_time] = np.nan
+
+    aligned = align_series([fast_time, slow_time], [fast_time**2, slow_signal])
+    grid = aligned[:, 0]
+    assert aligned.shape == (131, 3)
+    np.testing.assert_allclose(grid, np.arange(131) / 10.0, atol=1e-12)
+    np.testing.assert_allclose(aligned[:100, 1], fast_time**2)
+    assert np.isnan(aligned[100:, 1]).all()
+    # the slow trace is linear, so interpolation reproduces it within its span
+    next_to_nan = np.abs(grid - nan_time) < 1.0
+    inside = (grid >= slow_start) & (grid <= slow_stop) & ~next_to_nan
+    np.testing.assert_allclose(aligned[inside, 2], 3.0 * grid[inside])
+    assert np.isnan(aligned[grid < slow_start, 2]).all()
+    # the grid points next to the NaN sample stay a gap
+    assert np.isnan(aligned[next_to_nan, 2]).all()
+
+
+def test_common_timebase():
+    duration, max_samples, step = 1000.0, 1000, 10.0
+    axes = [np.arange(0.0, duration, 0.001)]
+    grid = common_timebase(axes, max_samples=max_samples)
+    assert len(grid) == max_samples
+    assert (grid[0], grid[-1]) == pytest.approx((0.0, 999.999))
+    assert len(common_timebase(axes, step=step)) == duration / step
+    assert len(common_timebase([np.empty(0)])) == 0
+
+
+def test_aligned_sensors():
+    environment = SampleGrowingEnvironment(
+        sensor=[
+            SensorDescription(
+                name='pressure', time=np.arange(10.0), signal=np.ones(10)
+            ),
+            SensorDescription(name='setpoint'),
+            SensorDescription(
+                measurement='temperature',
+                time=np.arange(0.0, 10.0, 0.5),
+                signal=np.arange(20.0),
+            ),
+        ]
+    )
+    names, aligned = environment.aligned_sensors()
+    assert names == ['time', 'pressure', 'temperature']
+    assert aligned.shape == (20, 3)
+    assert not aligned.flags.writeable
+    np.testing.assert_allclose(aligned[:, 2], np.arange(20.0))
+    assert np.isnan(aligned[-1, 1])
+    # cached until a sensor changes
+    assert environment.aligned_sensors()[1] is aligned
+    assert len(environment.aligned_sensors(step=1.0)[1]) == len(
+        environment.sensor[0].time
+    )
+
+    environment.sensor[0].signal = np.zeros(10)
+    names, changed = environment.aligned_sensors()
+    assert changed is not aligned
+    np.testing.assert_allclose(changed[:-1:2, 1], 0.0)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from nomad_plugin_mbe.schema_packages.calibration import (
+    cell_matrix,
+    fit_cell_rates,
+    inconsistent_layers,
+    layer_rates,
+)
+
+
+def test_fit_cell_rates():
+    # GaAs, AlAs, As and Ga layers, five times, and one layer of an In cell that stays
+    # closed
+    patterns = [['Ga', 'As'], ['Al', 'As'], ['As'], ['Ga']]
+    rows, names = [], []
+    for index in range(20):
+        rows.extend([index] * len(patterns[index % 4]))
+        names.extend(patterns[index % 4])
+    cell_names, open_matrix = cell_matrix(
+        rows + [20], names + ['In'], [1] * len(rows) + [0], 22
+    )
+    assert list(cell_names) == ['Al', 'As', 'Ga', 'In']
+    rates = np.array([1.5, 0.8, 0.5, 1.0] * 5 + [2.0, 3.0])
+
+    cell_rates, residuals, rank = fit_cell_rates(open_matrix, rates)
+    assert rank == len(cell_names) - 1
+    np.testing.assert_allclose(cell_rates[:3], [0.3, 0.5, 1.0])
+    assert np.isnan(cell_rates[3])  # In is never open
+    np.testing.assert_allclose(residuals[:20], 0, atol=1e-12)
+    assert np.isnan(residuals[20:]).all()
+    assert len(inconsistent_layers(residuals, rates)) == 0
+
+    rates[7] = 1.6  # a Ga layer far off the rate of the Ga cell
+    cell_rates, residuals, _ = fit_cell_rates(open_matrix, rates)
+    assert list(inconsistent_layers(residuals, rates)) == [7]
+
+
+def test_layer_rates():
+    rates = layer_rates(
+        np.array([1.0, np.nan, np.nan, np.nan]),
+        np.array([30.0, 30.0, 30.0, np.nan]),
+        np.array([30.0, 60.0, 0.0, 10.0]),
+    )
+    np.testing.assert_array_equal(rates, [1.0, 0.5, np.nan, np.nan])
@@ -0,0 +1,36 @@
+import numpy as np
+
+from nomad_plugin_mbe.schema_packages.envelope import envelope_pyramid
+
+
+def test_envelope_pyramid():
+    rng = np.random.default_rng(0)
+    n = 100_000
+    time = np.arange(n) / 10.0
+    signal = rng.standard_normal(n)
+    signal[12345] = np.nan
+    coarse_bins = 1024
+
+    levels = envelope_pyramid(time, signal, finest_bin_size=64, coarse_bins=coarse_bins)
+    assert [bin_size for bin_size, *_ in levels] == [128, 64]
+    for bin_size, level_time, minimum, maximum in levels:
+        starts = np.arange(0, n, bin_size)
+        np.testing.assert_array_equal(level_time, time[starts])
+        for index in (0, 12345 // bin_size, len(starts) - 1):
+            samples = signal[starts[index] : starts[index] + bin_size]
+            assert minimum[index] == np.nanmin(samples)
+            assert maximum[index] == np.nanmax(samples)
+    assert len(levels[0][1]) <= coarse_bins
+
+    # short series are plotted as they are, a little longer ones get smaller bins
+    ((bin_size, level_time, minimum, maximum),) = envelope_pyramid(
+        time[:1000], signal[:1000]
+    )
+    assert bin_size == 1
+    np.testing.assert_array_equal(level_time, time[:1000])
+    np.testing.assert_array_equal(minimum, signal[:1000])
+    np.testing.assert_array_equal(maximum, signal[:1000])
+    assert envelope_pyramid(time[:0], signal[:0]) == []
+    assert [
+        bin_size for bin_size, *_ in envelope_pyramid(time[:3000], signal[:3000])
+    ] == [4]
@@ -0,0 +1,33 @@
+import pytest
+
+from nomad_plugin_mbe.schema_packages.formula import parse_formula, reduced_formula
+
+
+def test_parse_formula():
+    assert parse_formula('GaAs') == (('As', 'Ga'), (('Ga', 1.0), ('As', 1.0)))
+    assert parse_formula('AlGaAs', 0.3) == (
+        ('Al', 'As', 'Ga'),
+        (('Al', 0.3), ('Ga', 0.7), ('As', 1.0)),
+    )
+    # the composition of a ternary alloy is unknown without its alloy fraction
+    assert parse_formula('InGaAs') == (('As', 'Ga', 'In'), None)
+    assert reduced_formula('AlGaAs', 0.3) == 'Al0.3Ga0.7As'
+    assert reduced_formula('Al0.3Ga0.7As') == 'Al0.3Ga0.7As'
+    assert reduced_formula('Si') == 'Si'
+    for formula in ('Xy', 'GaAs;', ''):
+        with pytest.raises(ValueError):
+            parse_formula(formula)
+
+
+def test_parse_alloy_formula():
+    # the alloy fraction belongs to the site with two elements, here group V
+    assert parse_formula('GaAsSb', 0.3)[1] == (('Ga', 1.0), ('As', 0.3), ('Sb', 0.7))
+    assert reduced_formula('GaAsSb', 0.3) == 'GaAs0.3Sb0.7'
+    assert reduced_formula('ZnMgO', 0.9) == 'Zn0.9Mg0.1O'
+    # quaternary alloys need explicit amounts, one alloy fraction cannot fix them
+    assert parse_formula('InGaAsP') == (('As', 'Ga', 'In', 'P'), None)
+    assert reduced_formula('InGaAsP', 0.3) is None
+    assert reduced_formula('In0.7Ga0.3As0.6P0.4') == 'In0.7Ga0.3As0.6P0.4'
+    # without one mixed site the shared site is ambiguous
+    assert reduced_formula('AlGaIn', 0.3) is None
+    assert reduced_formula('SiGeC', 0.3) is None
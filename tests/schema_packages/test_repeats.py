@@ -0,0 +1,12 @@
+from nomad_plugin_mbe.schema_packages.repeats import find_repeats
+
+
+def test_find_repeats():
+    assert find_repeats(list('XABABABABY')) == [(1, 2, 4)]
+    assert find_repeats(list('ABCABCABCDD')) == [(0, 3, 3), (9, 1, 2)]
+    # the shortest period is taken for the same coverage
+    assert find_repeats(list('ABAB' * 1000)) == [(0, 2, 2000)]
+    assert find_repeats(list('ABCD')) == []
+    assert find_repeats([]) == []
+    assert find_repeats(list('ABCDEABCDE'), max_period=4) == []
+    assert find_repeats(list('ABABAB'), min_repetitions=4) == []
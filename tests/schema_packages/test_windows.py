@@ -0,0 +1,51 @@
+import numpy as np
+
+from nomad_plugin_mbe.schema_packages.windows import layer_boundaries, window_statistics
+
+
+def test_window_statistics():
+    rng = np.random.default_rng(0)
+    time = np.sort(rng.uniform(0, 100, 5000))
+    signal = 1e-9 * (1 + rng.standard_normal(5000))
+    boundaries = layer_boundaries([10.0, 0.0, 25.0, 30.0, np.nan, 5.0])
+    assert list(boundaries[:5]) == [0.0, 10.0, 10.0, 35.0, 65.0]
+
+    count, mean, minimum, maximum, std = window_statistics(time, signal, boundaries)
+    for index in range(4):
+        window = signal[(time >= boundaries[index]) & (time < boundaries[index + 1])]
+        assert count[index] == len(window)
+        if len(window):
+            np.testing.assert_allclose(mean[index], window.mean(), rtol=1e-10)
+            np.testing.assert_allclose(std[index], window.std(), rtol=1e-8)
+            assert (minimum[index], maximum[index]) == (window.min(), window.max())
+    assert count[1] == 0 and np.isnan(mean[1])
+    # the windows after a layer without growth time are unknown
+    assert list(count[4:]) == [0, 0] and np.isnan(mean[4:]).all()
+
+    # unsorted time axes are sorted first
+    order = rng.permutation(5000)
+    shuffled = window_statistics(time[order], signal[order], boundaries)
+    np.testing.assert_allclose(shuffled[1], mean, rtol=1e-10)
+
+
+def test_window_statistics_without_samples():
+    count, mean, *_ = window_statistics(np.arange(10.0), np.ones(10), [20.0, 30.0])
+    assert list(count) == [0] and np.isnan(mean).all()
+
+
+def test_window_statistics_with_nan_samples():
+    time = np.arange(20.0)
+    signal = np.arange(20.0)
+    signal[[2, 3, 15]] = np.nan
+    signal[10:15] = np.nan
+
+    count, mean, minimum, maximum, std = window_statistics(
+        time, signal, [0.0, 10.0, 15.0, 20.0]
+    )
+    assert list(count) == [8, 0, 4]
+    window = np.array([0.0, 1.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0])
+    np.testing.assert_allclose(mean[0], window.mean())
+    np.testing.assert_allclose(std[0], window.std())
+    assert (minimum[0], maximum[0]) == (0.0, 9.0)
+    assert np.isnan([mean[1], minimum[1], maximum[1], std[1]]).all()
+    assert (mean[2], minimum[2], maximum[2]) == (17.5, 16.0, 19.0)